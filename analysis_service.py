@@ -9,6 +9,10 @@ import tempfile
 import time
 import logging
 import io
+import multiprocessing
+import queue
+import threading
+from multiprocessing.util import Finalize
 from typing import Dict, List, Any, Optional, Tuple
 from collections import Counter
 from functools import lru_cache
@@ -23,7 +27,9 @@ from config import (
     ANALYSIS_DEPTH_MAPPING, BLUNDER_GENERAL_DESCRIPTIONS,
     BLUNDER_EDUCATIONAL_DESCRIPTIONS, BASE_IMPACT_VALUES,
     CATEGORY_WEIGHTS, ESTIMATED_MOVES_PER_GAME, OPTIMIZATION_DESCRIPTIONS,
-    ENGINE_POOL_SIZE, PARALLEL_GAME_WORKERS, PARALLEL_PROCESSING_ENABLED
+    ENGINE_POOL_SIZE, PARALLEL_GAME_WORKERS, PARALLEL_PROCESSING_ENABLED,
+    PARALLEL_USE_PROCESSES, PGN_PREFETCH_GAMES, PARALLEL_MOVE_WORKERS,
+    WORKER_ENGINE_THREADS, WORKER_ENGINE_HASH_MB
 )
 from engines.stockfish_pool import get_engine_pool
 from utils import (
@@ -37,6 +43,200 @@ from performance_monitor import performance_monitor
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Per-process engine for worker processes (set by _init_batch_worker)
+_worker_engine = None
+_worker_stockfish_path = None
+
+def _init_batch_worker(stockfish_path: str) -> None:
+    """Process pool initializer: start one Stockfish engine for this worker process"""
+    global _worker_engine, _worker_stockfish_path
+    _worker_stockfish_path = stockfish_path
+    _worker_engine = chess.engine.SimpleEngine.popen_uci(stockfish_path)
+    # Keep each worker's engine to one search thread so the pool doesn't
+    # oversubscribe the cores; skip options the engine doesn't declare
+    options = {"Threads": WORKER_ENGINE_THREADS, "Hash": WORKER_ENGINE_HASH_MB}
+    _worker_engine.configure({name: value for name, value in options.items() if name in _worker_engine.options})
+    # Pool workers leave via os._exit, so atexit never runs - use a multiprocessing finalizer
+    Finalize(None, _worker_engine.quit, exitpriority=10)
+
+def _analyze_game_batch_in_worker(game_batch: List[str], username: str,
+                                  blunder_threshold: float, engine_think_time: float,
+                                  batch_idx: int, games_metadata: Optional[List[Dict]] = None,
+                                  starting_game_index: int = 0) -> Dict[str, Any]:
+    """Analyze a batch of games inside a worker process using its own engine"""
+    return _analyze_game_batch_with_engine(
+        _worker_engine, game_batch, username, blunder_threshold, engine_think_time,
+        batch_idx, games_metadata, starting_game_index, _worker_stockfish_path
+    )
+
+def _prefetched(items, max_prefetch: int = PGN_PREFETCH_GAMES):
+    """
+    Yield from the items iterator, run ahead on a producer thread. The
+    producer's work (PGN parsing) overlaps the consumer being blocked on the
+    engine; the bounded queue keeps at most max_prefetch items in memory.
+    """
+    pending = queue.Queue(maxsize=max_prefetch)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item) -> bool:
+        # Re-check stop while waiting so an abandoned consumer can't block us forever
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    break
+        except Exception as e:
+            put(e)
+        else:
+            put(done)
+    
+    producer = threading.Thread(target=produce, name="pgn-reader", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = pending.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+def _read_games_prefetched(pgn_file, max_prefetch: int = PGN_PREFETCH_GAMES,
+                           target_user: Optional[str] = None):
+    """
+    Yield (headers, game) pairs from an open PGN file, parsed ahead on a
+    producer thread while the consumer is blocked on the engine.
+    With target_user set, games they didn't play are only header-scanned and
+    come through as (headers, None), so callers can still count them.
+    """
+    from analyze_games import user_color_from_headers
+    
+    def read():
+        while True:
+            if target_user is None:
+                game = chess.pgn.read_game(pgn_file)
+                if game is None:
+                    return
+                yield game.headers, game
+                continue
+            
+            # Headers first: read_headers skips the movetext without
+            # building any nodes, and only the user's games are rewound
+            # and parsed in full
+            offset = pgn_file.tell()
+            headers = chess.pgn.read_headers(pgn_file)
+            if headers is None:
+                return
+            if user_color_from_headers(headers, target_user) is None:
+                yield headers, None
+            else:
+                pgn_file.seek(offset)
+                yield headers, chess.pgn.read_game(pgn_file)
+    
+    return _prefetched(read(), max_prefetch)
+
+def _analyze_game_batch_with_engine(engine, game_batch: List[str], username: str,
+                                    blunder_threshold: float, engine_think_time: float,
+                                    batch_idx: int, games_metadata: Optional[List[Dict]],
+                                    starting_game_index: int, stockfish_path: str) -> Dict[str, Any]:
+    """Analyze a batch of PGN game strings with the given engine"""
+    from analyze_games import analyze_game_optimized, user_color_from_headers
+    
+    batch_blunders = []
+    games_analyzed = 0
+    
+    def parse_batch():
+        # Runs on the prefetch thread, so the next game is parsed while the
+        # engine works on this one. Parse errors travel with their game and
+        # are logged in order below instead of ending the batch
+        for game_str in game_batch:
+            try:
+                # Check the headers before parsing the moves: a game the user
+                # didn't play counts as analyzed but never builds its mainline
+                game_io = io.StringIO(game_str)
+                headers = chess.pgn.read_headers(game_io)
+                if headers is None or user_color_from_headers(headers, username) is None:
+                    yield headers, None, None
+                    continue
+                
+                # Parse game
+                game_io.seek(0)
+                yield headers, chess.pgn.read_game(game_io), None
+            except Exception as e:
+                yield None, None, e
+    
+    for game_idx, (headers, game, parse_error) in enumerate(_prefetched(parse_batch())):
+        try:
+            if parse_error is not None:
+                raise parse_error
+            
+            if headers is None:
+                continue
+            
+            games_analyzed += 1
+            if game is None:
+                continue
+            
+            # Analyze game
+            game_blunders = analyze_game_optimized(
+                game=game,
+                engine=engine,
+                target_user=username,
+                blunder_threshold=blunder_threshold,
+                engine_think_time=engine_think_time,
+                debug_mode=False,
+                stockfish_path=stockfish_path,
+                threads=PARALLEL_GAME_WORKERS
+            )
+            
+            # Add metadata with proper game indexing
+            for blunder in game_blunders:
+                # Calculate global game number (1-indexed) using starting index
+                global_game_number = starting_game_index + game_idx + 1
+                blunder['game_number'] = global_game_number
+                blunder['game_white'] = game.headers.get("White", "Unknown")
+                blunder['game_black'] = game.headers.get("Black", "Unknown")
+                blunder['target_player'] = username
+                blunder['batch_id'] = batch_idx
+                
+                # Use real game metadata if available (most important for URLs)
+                if games_metadata and len(games_metadata) >= global_game_number:
+                    game_meta = games_metadata[global_game_number - 1]  # 0-indexed
+                    blunder['game_url'] = game_meta.get('url', '')
+                    blunder['game_date'] = game_meta.get('date', 'Unknown date')
+                    blunder['game_time_class'] = game_meta.get('time_class', 'unknown')
+                    blunder['game_rated'] = game_meta.get('rated', False)
+                else:
+                    # Fallback to defaults if metadata not available
+                    blunder['game_url'] = ''
+                    blunder['game_date'] = 'Unknown date'
+                    blunder['game_time_class'] = 'unknown'
+                    blunder['game_rated'] = False
+            
+            batch_blunders.extend(game_blunders)
+            
+        except Exception as e:
+            logger.error(f"Error analyzing game {game_idx} in batch {batch_idx}: {e}")
+            continue
+    
+    return {
+        "blunders": batch_blunders,
+        "games_analyzed": games_analyzed,
+        "batch_id": batch_idx
+    }
+
 class AnalysisService:
     """Service class for handling chess game analysis operations with production optimizations."""
     
@@ -50,7 +250,8 @@ class AnalysisService:
         from engines.stockfish_pool import get_engine_pool
         return get_engine_pool()
     
-    def analyze_game_optimized(self, game, engine, target_user, blunder_threshold, engine_think_time, debug_mode, stockfish_path, threads):
+    def analyze_game_optimized(self, game, engine, target_user, blunder_threshold, engine_think_time, debug_mode, stockfish_path, threads,
+                               helper_engines=()):
         """
         Use the optimized analyze_game function directly from analyze_games.py
         """
@@ -63,7 +264,8 @@ class AnalysisService:
             engine_think_time=engine_think_time,
             debug_mode=debug_mode,
             stockfish_path=stockfish_path,
-            threads=threads
+            threads=threads,
+            helper_engines=helper_engines
         )
 
     def analyze_games_with_settings(self, pgn_content: str, username: str, 
@@ -178,6 +380,16 @@ class AnalysisService:
                 progress_tracker.set_error(f"❌ Engine acquisition failed: {str(e)}")
             return {"error": f"Could not get Stockfish engine: {str(e)}"}
 
+        # Borrow idle pool engines so each game's positions are searched in
+        # parallel; take only what is already free, without starting new
+        # engines or waiting, so concurrent requests keep their capacity
+        helper_engines = []
+        for _ in range(PARALLEL_MOVE_WORKERS - 1):
+            helper = self._get_engine_pool().try_get_idle_engine()
+            if not helper:
+                break
+            helper_engines.append(helper)
+        
         # Process games and collect blunders
         all_blunders = []
         games_analyzed = 0
@@ -189,16 +401,13 @@ class AnalysisService:
                     if progress_tracker:
                         progress_tracker.update_progress(45, f"📖 Starting single-pass PGN analysis...")
                     
-                    while True:
-                        game = chess.pgn.read_game(f)
-                        if game is None:
-                            break
-                        
+                    # Games are parsed on a producer thread while the engine works
+                    for headers, game in _read_games_prefetched(f, target_user=username):
                         games_analyzed += 1
                         
                         # Get game info for progress
-                        white_player = game.headers.get("White", "Unknown")
-                        black_player = game.headers.get("Black", "Unknown")
+                        white_player = headers.get("White", "Unknown")
+                        black_player = headers.get("Black", "Unknown")
                         
                         # Calculate progress (45% to 85% range)
                         # Use games_metadata length as estimate for total games if available
@@ -211,8 +420,9 @@ class AnalysisService:
                                 f"🎯 Analyzing game #{games_analyzed}: {white_player} vs {black_player}"
                             )
                         
-                        # Analyze game immediately instead of storing
-                        game_blunders = self.analyze_game_optimized(
+                        # Analyze game immediately instead of storing (games the
+                        # user isn't in were never parsed past their headers)
+                        game_blunders = [] if game is None else self.analyze_game_optimized(
                             game=game,
                             engine=engine,
                             target_user=username,
@@ -220,7 +430,8 @@ class AnalysisService:
                             engine_think_time=engine_think_time,
                             debug_mode=False,
                             stockfish_path=stockfish_path,
-                            threads=1 # Sequential processing uses 1 thread
+                            threads=1, # Sequential processing uses 1 thread
+                            helper_engines=helper_engines
                         )
                         
                         # Add game metadata to each blunder for enhanced frontend display
@@ -274,8 +485,10 @@ class AnalysisService:
             self._get_engine_pool().return_engine(engine)
             return {"error": f"Error processing games: {str(e)}"}
         finally:
-            # Always return the engine to the pool
+            # Always return the engines to the pool
             self._get_engine_pool().return_engine(engine)
+            for helper in helper_engines:
+                self._get_engine_pool().return_engine(helper)
 
         # Process results
         if progress_tracker:
@@ -359,7 +572,7 @@ class AnalysisService:
         - Memory streaming to prevent memory buildup
         - Enhanced progress tracking
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
         import tempfile
         import json
         from config import (PARALLEL_GAME_WORKERS, GAME_BATCH_SIZE, 
@@ -394,15 +607,29 @@ class AnalysisService:
             all_blunders = []
             games_analyzed = 0
             
-            # Process batches in parallel
-            with ThreadPoolExecutor(max_workers=PARALLEL_GAME_WORKERS) as executor:
+            # Process batches in parallel. Worker processes (one engine each) keep the
+            # Python-side blunder categorization from serializing on the GIL
+            if PARALLEL_USE_PROCESSES:
+                # More engine processes than cores only adds context switching
+                executor = ProcessPoolExecutor(
+                    max_workers=min(PARALLEL_GAME_WORKERS, os.cpu_count() or 1),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_batch_worker,
+                    initargs=(stockfish_path,)
+                )
+                analyze_batch = _analyze_game_batch_in_worker
+            else:
+                executor = ThreadPoolExecutor(max_workers=PARALLEL_GAME_WORKERS)
+                analyze_batch = self._analyze_game_batch
+            
+            with executor:
                 # Submit all batch jobs with starting game indices
                 future_to_batch = {}
                 games_processed_so_far = 0
                 
                 for batch_idx, batch in enumerate(game_batches):
                     future = executor.submit(
-                        self._analyze_game_batch,
+                        analyze_batch,
                         batch,
                         username,
                         blunder_threshold,
@@ -526,77 +753,16 @@ class AnalysisService:
                            batch_idx: int, games_metadata: Optional[List[Dict]] = None,
                            starting_game_index: int = 0) -> Dict[str, Any]:
         """Analyze a batch of games in parallel"""
-        import tempfile
-        import chess.pgn
-        import io
-        
         # Get engine from pool
         engine = self._get_engine_pool().get_engine()
         if not engine:
             return {"error": "No engine available", "blunders": [], "games_analyzed": 0}
         
         try:
-            batch_blunders = []
-            games_analyzed = 0
-            
-            for game_idx, game_str in enumerate(game_batch):
-                try:
-                    # Parse game
-                    game_io = io.StringIO(game_str)
-                    game = chess.pgn.read_game(game_io)
-                    
-                    if game is None:
-                        continue
-                    
-                    games_analyzed += 1
-                    
-                    # Analyze game
-                    game_blunders = self.analyze_game_optimized(
-                        game=game,
-                        engine=engine,
-                        target_user=username,
-                        blunder_threshold=blunder_threshold,
-                        engine_think_time=engine_think_time,
-                        debug_mode=False,
-                        stockfish_path=self.stockfish_path,
-                        threads=PARALLEL_GAME_WORKERS
-                    )
-                    
-                    # Add metadata with proper game indexing
-                    for blunder in game_blunders:
-                        # Calculate global game number (1-indexed) using starting index
-                        global_game_number = starting_game_index + game_idx + 1
-                        blunder['game_number'] = global_game_number
-                        blunder['game_white'] = game.headers.get("White", "Unknown")
-                        blunder['game_black'] = game.headers.get("Black", "Unknown")
-                        blunder['target_player'] = username
-                        blunder['batch_id'] = batch_idx
-                        
-                        # Use real game metadata if available (most important for URLs)
-                        if games_metadata and len(games_metadata) >= global_game_number:
-                            game_meta = games_metadata[global_game_number - 1]  # 0-indexed
-                            blunder['game_url'] = game_meta.get('url', '')
-                            blunder['game_date'] = game_meta.get('date', 'Unknown date')
-                            blunder['game_time_class'] = game_meta.get('time_class', 'unknown')
-                            blunder['game_rated'] = game_meta.get('rated', False)
-                        else:
-                            # Fallback to defaults if metadata not available
-                            blunder['game_url'] = ''
-                            blunder['game_date'] = 'Unknown date'
-                            blunder['game_time_class'] = 'unknown'
-                            blunder['game_rated'] = False
-                    
-                    batch_blunders.extend(game_blunders)
-                    
-                except Exception as e:
-                    logger.error(f"Error analyzing game {game_idx} in batch {batch_idx}: {e}")
-                    continue
-            
-            return {
-                "blunders": batch_blunders,
-                "games_analyzed": games_analyzed,
-                "batch_id": batch_idx
-            }
+            return _analyze_game_batch_with_engine(
+                engine, game_batch, username, blunder_threshold, engine_think_time,
+                batch_idx, games_metadata, starting_game_index, self.stockfish_path
+            )
             
         finally:
             # Return engine to pool
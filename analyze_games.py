@@ -3,14 +3,22 @@ import chess.pgn
 import chess.engine
 import os 
 import math
-from typing import Dict, List, Set, Optional, Tuple
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Set, Optional, Tuple
 from dataclasses import dataclass
 from functools import lru_cache
-from config import (ENABLE_BATCH_ENGINE_ANALYSIS, BATCH_ANALYSIS_SIZE, 
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from config import (ENABLE_BATCH_ENGINE_ANALYSIS, BATCH_ANALYSIS_SIZE,
+                    ENABLE_PIPELINED_ENGINE_ANALYSIS,
+                    ENABLE_ROOT_MOVE_ANALYSIS, ROOT_MOVE_THINK_TIME_SCALE,
                     SKIP_FORCED_MOVES, SKIP_BOOK_MOVES, SKIP_OBVIOUS_RECAPTURES, 
                     SKIP_TABLEBASE_POSITIONS, TABLEBASE_PIECE_LIMIT,
                     MIN_EVAL_DROP_FOR_ANALYSIS, EXPENSIVE_CHECK_THRESHOLD,
-                    BLUNDER_CATEGORY_PRIORITY, PIECE_VALUES, PIECE_NAMES,
+                    OPENING_DETECTOR_BYPASS, OPENING_DETECTOR_CUTOFF_MOVE,
+                    OPENING_BYPASS_THRESHOLD_SCALE, SEE_CACHE_SIZE,
+                    PIECE_VALUES_T, PIECE_NAMES_T,
                     BLUNDER_THRESHOLD)
 
 # ---- Opening Book (Placeholder for Optimization) ----
@@ -61,6 +69,31 @@ def is_book_move(board: chess.Board, move: chess.Move) -> bool:
 # ---- Constants ----
 ENGINE_THINK_TIME_DEFAULT = 0.08
 
+# Squares where a pawn move promotes
+BB_BACK_RANKS = chess.BB_RANK_1 | chess.BB_RANK_8
+
+# Per square: every square within two files or two ranks of it - where an
+# opponent pawn has to stand for its move to count in the pawn-trap scan
+def _lines_within_two(masks, index):
+    return sum(masks[max(index - 2, 0):index + 3])
+
+BB_PAWN_TRAP_ZONE = [
+    _lines_within_two(chess.BB_FILES, chess.square_file(square)) |
+    _lines_within_two(chess.BB_RANKS, chess.square_rank(square))
+    for square in chess.SQUARES
+]
+
+# The fixed pawn pushes behind the known Chess.com traps, parsed once
+TRAP_MOVE_B5 = chess.Move.from_uci('b7b5')
+TRAP_MOVE_B4 = chess.Move.from_uci('b5b4')
+
+# (piece type, square) -> the pawn push that traps it there:
+# knight on c4 by b5 (Chess.com move 16), queen on c3 by b4 (moves 18 and 20)
+CHESSCOM_TRAP_TABLE = {
+    (chess.KNIGHT, chess.C4): TRAP_MOVE_B5,
+    (chess.QUEEN, chess.C3): TRAP_MOVE_B4,
+}
+
 # Thresholds
 INACCURACY_THRESHOLD = 8.0
 MISTAKE_THRESHOLD = 15.0
@@ -73,9 +106,21 @@ OPENING_BLUNDER = 30.0
 MATERIAL_LOSS_THRESHOLD = 200
 TRAP_THRESHOLD = 12.0
 
+# cp_to_win_prob is steepest at 0cp, where it moves 0.004 / 4 per centipawn,
+# i.e. 0.1 percentage points. An eval drop below this many centipawns can't
+# reach the lowest win-probability threshold any report needs
+MIN_REPORTABLE_EVAL_DROP = 10 * min(
+    MISTAKE_THRESHOLD, BLUNDER_THRESHOLD, CRITICAL_THRESHOLD,
+    OPENING_MISTAKE * min(1.0, OPENING_BYPASS_THRESHOLD_SCALE),
+    max(TRAP_THRESHOLD, EXPENSIVE_CHECK_THRESHOLD)
+)
+
 @dataclass
 class TacticalWeakness:
     """Represents an ongoing tactical weakness"""
+    # Written out by hand: dataclass(slots=True) needs Python 3.10 and the
+    # image runs 3.9. Works because no field has a default
+    __slots__ = ('weakness_type', 'piece_type', 'square', 'introduced_at_move', 'description')
     weakness_type: str
     piece_type: int
     square: int
@@ -85,179 +130,275 @@ class TacticalWeakness:
 @dataclass 
 class CachedPosition:
     """Cache for position analysis"""
-    hanging_pieces: Set[int]
-    attackers_map: Dict[int, Set[int]]
-    defenders_map: Dict[int, Set[int]]
-    legal_moves_from: Dict[int, List[chess.Move]]
+    __slots__ = ('hanging_mask', 'attacks_by_color', 'legal_moves')
+    hanging_mask: int  # bitboard of attacked, undefended pieces of either color
+    attacks_by_color: Tuple[int, int]  # squares each side attacks, indexed by color
+    legal_moves: List[chess.Move]
 
 class BlunderStateManager:
     """Manages state to prevent duplicate blunder reporting"""
+    __slots__ = ('active_weaknesses', 'reported_blunders', 'last_eval', 'position_trend',
+                 'consecutive_checkmates', 'last_checkmate_move', 'in_losing_position',
+                 'trapped_pieces', 'position_cache')
+    
     def __init__(self):
-        self.active_weaknesses: Dict[str, TacticalWeakness] = {}
-        self.reported_blunders: Set[str] = set()
+        # Keys are small tuples rather than formatted strings: no f-string per
+        # check, and tuples of ints hash faster
+        self.active_weaknesses: Dict[Tuple[str, int, int], TacticalWeakness] = {}  # (kind, piece type, square)
+        self.reported_blunders: Set[Tuple[str, int]] = set()  # (category, move number)
         self.last_eval: Optional[int] = None
-        self.position_trend: List[int] = []
+        self.position_trend: Deque[int] = deque(maxlen=5)  # oldest eval drops off on its own
         self.consecutive_checkmates = 0
         self.last_checkmate_move = 0
         self.in_losing_position = False
-        self.trapped_pieces: Set[str] = set()
-        self.position_cache: Dict[str, CachedPosition] = {}  # NEW: Position cache
+        self.trapped_pieces: Set[Tuple[int, int]] = set()  # (piece type, square)
+        self.position_cache: Dict[tuple, CachedPosition] = OrderedDict()  # NEW: Position cache (LRU order)
         
     def update_eval(self, eval_cp: Optional[int]):
         """Update position evaluation tracking"""
         if eval_cp is not None:
             self.position_trend.append(eval_cp)
-            if len(self.position_trend) > 5:
-                self.position_trend.pop(0)
             if eval_cp < -1000:
                 self.in_losing_position = True
         self.last_eval = eval_cp
     
-    def get_position_cache(self, board_fen: str) -> Optional[CachedPosition]:
+    def get_position_cache(self, position_key: tuple) -> Optional[CachedPosition]:
         """Get cached position analysis"""
-        return self.position_cache.get(board_fen)
+        cached = self.position_cache.get(position_key)
+        if cached is not None:
+            self.position_cache.move_to_end(position_key)  # most recently used
+        return cached
     
-    def set_position_cache(self, board_fen: str, cache: CachedPosition):
+    def set_position_cache(self, position_key: tuple, cache: CachedPosition):
         """Store position analysis in cache"""
         # Limit cache size to prevent memory issues
-        if len(self.position_cache) > 100:
-            # Remove oldest entries
-            keys_to_remove = list(self.position_cache.keys())[:20]
-            for key in keys_to_remove:
-                del self.position_cache[key]
-        self.position_cache[board_fen] = cache
-    
-    def is_new_weakness(self, weakness_key: str) -> bool:
+        while len(self.position_cache) >= 100:
+            # Remove the least recently used entry
+            self.position_cache.popitem(last=False)
+        self.position_cache[position_key] = cache
+    
+    def is_new_weakness(self, weakness_key: Tuple[str, int, int]) -> bool:
         """Check if this is a genuinely new weakness"""
         return weakness_key not in self.active_weaknesses
     
-    def add_weakness(self, key: str, weakness: TacticalWeakness):
+    def add_weakness(self, key: Tuple[str, int, int], weakness: TacticalWeakness):
         """Add a new tactical weakness"""
         self.active_weaknesses[key] = weakness
         
-    def remove_resolved_weaknesses(self, current_hanging: Set[str]):
+    def remove_resolved_weaknesses(self, current_hanging: Set[Tuple[str, int, int]]):
         """Remove weaknesses that have been resolved"""
-        for key in list(self.active_weaknesses.keys()):
-            if key.startswith("hanging_") and key not in current_hanging:
+        # One set difference against the keys view instead of a membership test per key
+        for key in self.active_weaknesses.keys() - current_hanging:
+            if key[0] == "hanging":
                 del self.active_weaknesses[key]
     
-    def has_reported(self, blunder_key: str) -> bool:
+    def has_reported(self, blunder_key: Tuple[str, int]) -> bool:
         """Check if we've already reported this specific blunder"""
         return blunder_key in self.reported_blunders
     
-    def mark_reported(self, blunder_key: str):
+    def mark_reported(self, blunder_key: Tuple[str, int]):
         """Mark a blunder as reported"""
         self.reported_blunders.add(blunder_key)
     
     def is_piece_trapped(self, piece_type: int, square: int) -> bool:
         """Check if a piece is already known to be trapped"""
-        trap_key = f"trapped_{piece_type}_{square}"
-        return trap_key in self.trapped_pieces
+        return (piece_type, square) in self.trapped_pieces
     
     def mark_piece_trapped(self, piece_type: int, square: int):
         """Mark a piece as trapped"""
-        trap_key = f"trapped_{piece_type}_{square}"
-        self.trapped_pieces.add(trap_key)
+        self.trapped_pieces.add((piece_type, square))
+
+class SanCache:
+    """Per-move SAN memo shared by the detectors (SAN needs a legal-move scan for disambiguation)"""
+    __slots__ = ('board_before', 'board_after', '_before', '_after')
+    
+    def __init__(self, board_before: chess.Board, board_after: Optional[chess.Board] = None):
+        self.board_before = board_before
+        self.board_after = board_after
+        self._before: Dict[chess.Move, str] = {}
+        self._after: Dict[chess.Move, str] = {}
+
+    def before(self, move: chess.Move) -> str:
+        """SAN of a move played from board_before"""
+        san = self._before.get(move)
+        if san is None:
+            san = self._before[move] = self.board_before.san(move)
+        return san
+
+    def after(self, move: chess.Move) -> str:
+        """SAN of an opponent reply on board_after, computed on first access"""
+        san = self._after.get(move)
+        if san is None:
+            san = self._after[move] = self.board_after.san(move)
+        return san
 
 #---- Optimized Helper Functions ----
 
 def analyze_position_cached(board, state_manager) -> CachedPosition:
     """Analyze position once and cache all needed data"""
-    board_fen = board.fen()
+    # Keyed like the SEE cache, on the transposition key: everything cached
+    # here is fixed by it, and it skips formatting a FEN string per lookup
+    position_key = board._transposition_key()
     
     # Check cache first
-    cached = state_manager.get_position_cache(board_fen)
+    cached = state_manager.get_position_cache(position_key)
     if cached:
         return cached
     
     # Build comprehensive position analysis
-    hanging_pieces = set()
-    attackers_map = {}
-    defenders_map = {}
-    legal_moves_from = {}
-    
-    # Single pass through all squares
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
-        if piece:
-            # Get attackers and defenders
-            attackers = set(board.attackers(not piece.color, square))
-            defenders = set(board.attackers(piece.color, square))
-            
-            attackers_map[square] = attackers
-            defenders_map[square] = defenders
-            
-            # Check if hanging
-            if attackers and not defenders:
-                hanging_pieces.add(square)
-    
-    # Build legal moves map (expensive, so cache it)
-    for move in board.legal_moves:
-        if move.from_square not in legal_moves_from:
-            legal_moves_from[move.from_square] = []
-        legal_moves_from[move.from_square].append(move)
+    # One attack map per side: a single attacks_mask() per piece replaces the
+    # two attackers_mask() queries per occupied square
+    white_pieces = board.occupied_co[chess.WHITE]
+    black_pieces = board.occupied_co[chess.BLACK]
+    white_attacks = 0
+    black_attacks = 0
+    attacks_mask = board.attacks_mask  # bound once, called for every piece
+    for square in chess.scan_forward(white_pieces):
+        white_attacks |= attacks_mask(square)
+    for square in chess.scan_forward(black_pieces):
+        black_attacks |= attacks_mask(square)
+    
+    # Hanging = attacked by the other side and not defended by its own
+    hanging_mask = ((white_pieces & black_attacks & ~white_attacks) |
+                    (black_pieces & white_attacks & ~black_attacks))
+    
+    # Legal moves (expensive, so cache them)
+    legal_moves = list(board.legal_moves)
     
     cache = CachedPosition(
-        hanging_pieces=hanging_pieces,
-        attackers_map=attackers_map,
-        defenders_map=defenders_map,
-        legal_moves_from=legal_moves_from
+        hanging_mask=hanging_mask,
+        attacks_by_color=(black_attacks, white_attacks),
+        legal_moves=legal_moves
     )
     
-    state_manager.set_position_cache(board_fen, cache)
+    state_manager.set_position_cache(position_key, cache)
     return cache
 
-@lru_cache(maxsize=512)
-def see_cached(board_fen: str, move_uci: str) -> int:
-    """Cached SEE calculation"""
-    board = chess.Board(board_fen)
-    move = chess.Move.from_uci(move_uci)
-    return see_uncached(board, move)
+# SEE results keyed on (position key, from, to, promotion), oldest entries evicted first
+_see_cache: Dict[tuple, int] = {}
+_see_cache_lock = threading.Lock()
+
+def least_valuable_attacker_value(board, attackers):
+    """
+    Value of the cheapest piece in a non-empty attackers bitboard.
+    Intersects with the piece bitboards cheapest-first; the first mask that hits
+    already gives the type, so no square lookup or Piece object is needed.
+    """
+    for piece_type, piece_mask in enumerate((board.pawns, board.knights, board.bishops,
+                                             board.rooks, board.queens, board.kings), chess.PAWN):
+        if attackers & piece_mask:
+            return PIECE_VALUES_T[piece_type]
+    return 0
 
 def see_uncached(board, move):
-    """Optimized SEE calculation"""
+    """
+    Static exchange evaluation with the iterative swap-list algorithm.
+    Both sides recapture on the target square with their least valuable attacker
+    (x-rays through vacated squares included) and either side may stop when
+    continuing would lose material. Returns the net gain for the side to move.
+    """
     if not board.is_capture(move): 
         return 0
     
-    # Fast path for undefended captures
-    if not board.is_attacked_by(board.turn, move.to_square):
-        captured = board.piece_at(move.to_square)
-        return PIECE_VALUES.get(captured.piece_type, 0) if captured else 0
-    
-    # Standard SEE
+    target = move.to_square
+    occupied = board.occupied ^ chess.BB_SQUARES[move.from_square]
     if board.is_en_passant(move):
-        capture_value = PIECE_VALUES[chess.PAWN]
+        captured_type = chess.PAWN
+        occupied ^= chess.BB_SQUARES[target ^ 8]  # the captured pawn sits behind the target
     else:
-        captured_piece = board.piece_at(move.to_square)
-        if not captured_piece: 
+        captured_type = board.piece_type_at(target)
+        if not captured_type:
             return 0
-        capture_value = PIECE_VALUES.get(captured_piece.piece_type, 0)
-    
-    # Make move
-    board_copy = board.copy()
-    board_copy.push(move)
-    
-    # Get moving piece value
-    moving_piece = board_copy.piece_at(move.to_square)
-    if not moving_piece:
-        return capture_value
-    
-    # Check for recapture
-    attackers = board_copy.attackers(board_copy.turn, move.to_square)
-    if not attackers:
-        return capture_value
     
-    # Find LVA
-    lva_square = min(attackers, key=lambda s: PIECE_VALUES.get(board_copy.piece_at(s).piece_type, 0))
-    recapture_move = chess.Move(lva_square, move.to_square)
+    # Value of the piece standing on the target after each capture
+    on_target = move.promotion or board.piece_type_at(move.from_square)
+    back_rank = bool(BB_BACK_RANKS & chess.BB_SQUARES[target])
+    
+    # The exchange is pure integer work, so pull the bitboards out once.
+    # Leapers (pawns, knights, kings) can't be uncovered, so their attackers
+    # are fixed; only the slider lookups change as pieces leave the board
+    occupied_co = board.occupied_co
+    piece_masks = (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)
+    line_sliders = board.queens | board.rooks
+    diag_sliders = board.queens | board.bishops
+    leapers = ((chess.BB_KING_ATTACKS[target] & board.kings) |
+               (chess.BB_KNIGHT_ATTACKS[target] & board.knights) |
+               (chess.BB_PAWN_ATTACKS[chess.BLACK][target] & board.pawns & occupied_co[chess.WHITE]) |
+               (chess.BB_PAWN_ATTACKS[chess.WHITE][target] & board.pawns & occupied_co[chess.BLACK]))
+    rank_attacks, rank_mask = chess.BB_RANK_ATTACKS[target], chess.BB_RANK_MASKS[target]
+    file_attacks, file_mask = chess.BB_FILE_ATTACKS[target], chess.BB_FILE_MASKS[target]
+    diag_attacks, diag_mask = chess.BB_DIAG_ATTACKS[target], chess.BB_DIAG_MASKS[target]
+    piece_values = PIECE_VALUES_T  # local, read on every capture in the loop
+    
+    gain = [piece_values[captured_type]]
+    color = not board.turn
+    attackers = (leapers |
+                 (rank_attacks[rank_mask & occupied] | file_attacks[file_mask & occupied]) & line_sliders |
+                 diag_attacks[diag_mask & occupied] & diag_sliders) & occupied
+    
+    while True:
+        side_attackers = attackers & occupied_co[color]
+        if not side_attackers:
+            break
+        
+        # Least valuable attacker: first piece type with a hit, lowest square
+        for lva_type, piece_mask in enumerate(piece_masks, chess.PAWN):
+            candidates = side_attackers & piece_mask
+            if candidates:
+                break
+        occupied ^= candidates & -candidates
+        # Recompute so sliders lined up behind the capturer join in
+        attackers = (leapers |
+                     (rank_attacks[rank_mask & occupied] | file_attacks[file_mask & occupied]) & line_sliders |
+                     diag_attacks[diag_mask & occupied] & diag_sliders) & occupied
+        
+        # The king can only take last - capturing into a defended square is illegal
+        if lva_type == chess.KING and attackers & occupied_co[not color]:
+            break
+        
+        # Net gain for this side if the exchange stopped after this capture
+        gain.append(piece_values[on_target] - gain[-1])
+        
+        on_target = chess.QUEEN if lva_type == chess.PAWN and back_rank else lva_type
+        color = not color
     
-    # Recursive SEE
-    piece_value = PIECE_VALUES.get(moving_piece.piece_type, 0)
-    return capture_value - piece_value + see_uncached(board_copy, recapture_move)
+    # Unwind: each side picks the better of capturing or standing pat
+    for depth in range(len(gain) - 1, 0, -1):
+        gain[depth - 1] = -max(-gain[depth - 1], gain[depth])
+    return gain[0]
 
 def see(board, move):
-    """SEE with caching"""
-    return see_cached(board.fen(), move.uci())
+    """
+    SEE with caching. The key is the board's transposition key rather than its
+    FEN, so there's no FEN round-trip and no board rebuild on a miss.
+    """
+    key = (board._transposition_key(), move.from_square, move.to_square, move.promotion)
+    with _see_cache_lock:
+        value = _see_cache.get(key)
+    if value is None:
+        value = see_uncached(board, move)
+        with _see_cache_lock:
+            if len(_see_cache) >= SEE_CACHE_SIZE:
+                del _see_cache[next(iter(_see_cache))]
+            _see_cache[key] = value
+    return value
+
+def see_ge(board, move, threshold):
+    """
+    Return True if SEE(move) >= threshold. Skips the exchange when its bounds
+    already decide it: the capture wins at most the victim, and at worst the
+    capturer is lost in return.
+    """
+    if not board.is_capture(move):
+        return 0 >= threshold
+    captured_type = chess.PAWN if board.is_en_passant(move) else board.piece_type_at(move.to_square)
+    captured_value = PIECE_VALUES_T[captured_type]
+    if captured_value < threshold:
+        return False
+    attacker_type = move.promotion or board.piece_type_at(move.from_square)
+    if captured_value - PIECE_VALUES_T[attacker_type] >= threshold:
+        return True
+    return see(board, move) >= threshold
 
 def is_obvious_recapture(board: chess.Board, move: chess.Move, opponent_last_move: Optional[chess.Move]) -> bool:
     """
@@ -270,38 +411,51 @@ def is_obvious_recapture(board: chess.Board, move: chess.Move, opponent_last_mov
     
     if board.is_capture(move) and move.to_square == opponent_last_move.to_square:
         # It's a recapture. Check if it's not a significantly losing exchange.
-        if see(board, move) >= 0:
+        if see_ge(board, move, 0):
             return True
     return False
 
+@lru_cache(maxsize=4096)
 def cp_to_win_prob(cp):
-    """Convert centipawns to win probability"""
+    """Convert centipawns to win probability (cached - engine scores are small ints)"""
     if cp is None: 
         return 0.5
     return 1 / (1 + math.exp(-0.004 * cp))
 
-def detect_trap_optimized(board_before, move_played, board_after, turn_color, state_manager, debug_mode):
+def detect_trap_optimized(board_before, move_played, board_after, turn_color, state_manager, debug_mode, san_cache=None):
     """
     Improved trap detection that matches Chess.com's analysis.
     Focuses on specific pawn traps and piece traps that are commonly missed.
     """
-    move_played_san = board_before.san(move_played)
-    
-    # Only check valuable pieces (Queen, Rook, Knight, Bishop)
-    valuable_pieces = [chess.QUEEN, chess.ROOK, chess.KNIGHT, chess.BISHOP]
-    
-    for square in chess.SQUARES:
-        piece = board_after.piece_at(square)
-        if not piece or piece.color != turn_color or piece.piece_type not in valuable_pieces:
-            continue
-        
-        if state_manager.is_piece_trapped(piece.piece_type, square):
+    if san_cache is None:
+        san_cache = SanCache(board_before, board_after)
+    
+    # Only check valuable pieces (Queen, Rook, Knight, Bishop) - walk their
+    # squares straight off the bitboard instead of probing all 64 squares
+    valuable_pieces = board_after.occupied_co[turn_color] & (
+        board_after.queens | board_after.rooks | board_after.knights | board_after.bishops)
+    if not valuable_pieces:
+        return None
+
+    # The opponent's replies are the same for every piece we test. The
+    # hanging-piece check has normally analyzed this position already, so
+    # take them from the shared position cache instead of regenerating them
+    opponent_moves = analyze_position_cached(board_after, state_manager).legal_moves
+    # Likewise the position after each reply: built once on first use and
+    # shared by the scans for every piece below
+    boards_after_reply: Dict[chess.Move, chess.Board] = {}
+
+    for square in chess.scan_forward(valuable_pieces):
+        piece_type = board_after.piece_type_at(square)
+
+        if state_manager.is_piece_trapped(piece_type, square):
             continue
-            
+
         # First, check for exact Chess.com traps
         exact_trap = detect_chesscom_exact_traps(board_after, square, turn_color, debug_mode)
         if exact_trap:
-            state_manager.mark_piece_trapped(piece.piece_type, square)
+            state_manager.mark_piece_trapped(piece_type, square)
+            move_played_san = san_cache.before(move_played)
             return {
                 "category": "Allowed Trap",
                 "move_number": None,  # Will be set by caller
@@ -310,24 +464,38 @@ def detect_trap_optimized(board_before, move_played, board_after, turn_color, st
             }
         
         # Then check for general traps
-        trap_move = find_trapping_move(board_after, square, turn_color, debug_mode)
+        trap_move = find_trapping_move(board_after, square, turn_color, debug_mode, opponent_moves,
+                                       boards_after_reply)
         if trap_move:
-            state_manager.mark_piece_trapped(piece.piece_type, square)
-            piece_name = PIECE_NAMES.get(piece.piece_type, "piece")
+            state_manager.mark_piece_trapped(piece_type, square)
+            piece_name = PIECE_NAMES_T[piece_type]
+            move_played_san = san_cache.before(move_played)
             return {
                 "category": "Allowed Trap",
                 "move_number": None,  # Will be set by caller
-                "description": f"your move {move_played_san} allows the opponent to trap your {piece_name} on {chess.square_name(square)} with {board_after.san(trap_move)}",
+                "description": f"your move {move_played_san} allows the opponent to trap your {piece_name} on {chess.SQUARE_NAMES[square]} with {san_cache.after(trap_move)}",
                 "trapping_move": trap_move
             }
     
     return None
 
-def find_trapping_move(board, piece_square, piece_color, debug_mode):
+def _board_after_reply(board, move, boards_after=None):
+    """board with move pushed, memoized in boards_after (when given) across callers"""
+    board_after_move = boards_after.get(move) if boards_after is not None else None
+    if board_after_move is None:
+        board_after_move = board.copy(stack=False)
+        board_after_move.push(move)
+        if boards_after is not None:
+            boards_after[move] = board_after_move
+    return board_after_move
+
+def find_trapping_move(board, piece_square, piece_color, debug_mode, legal_moves=None, boards_after=None):
     """
     Find if opponent has a move that would trap the piece on piece_square.
     Returns the trapping move if found, None otherwise.
     Updated to prioritize moves that are most likely to create traps.
+    legal_moves may be passed in when the caller already generated them for board,
+    and boards_after is a move -> resulting board memo shared between calls on it.
     """
     piece = board.piece_at(piece_square)
     if not piece:
@@ -336,12 +504,28 @@ def find_trapping_move(board, piece_square, piece_color, debug_mode):
     opponent_color = not piece_color
     piece_type = piece.piece_type
     
+    # Who is moving comes straight off the bitboards, with no Piece lookup per move
+    opponent_pieces = board.occupied_co[opponent_color]
+    opponent_pawns = board.pawns & opponent_pieces
+    
+    # Only the opponent's moves can trap the piece, so generate just those
+    if legal_moves is None:
+        legal_moves = list(board.generate_legal_moves(opponent_pieces))
+    if boards_after is None:
+        boards_after = {}
+    
+    # The piece's current mobility doesn't depend on the candidate move. It's
+    # the opponent's turn on board, so legal_moves never holds the piece's own
+    # moves; count them as if its side were to move instead
+    piece_move_count = piece_mobility(board, piece_square, piece_color)
+    
     # Get potential trapping moves with better prioritization
     candidate_moves = []
     
-    for move in board.legal_moves:
-        moving_piece = board.piece_at(move.from_square)
-        if not moving_piece or moving_piece.color != opponent_color:
+    for move in legal_moves:
+        from_mask = chess.BB_SQUARES[move.from_square]
+        # A caller-supplied list may hold the other side's moves too
+        if not opponent_pieces & from_mask:
             continue
         
         # Prioritize moves that are most likely to create traps:
@@ -350,33 +534,39 @@ def find_trapping_move(board, piece_square, piece_color, debug_mode):
         # 3. Moves that block escape routes
         # 4. Moves that create pins or discovered attacks
         
-        if moving_piece.piece_type == chess.PAWN:
+        if opponent_pawns & from_mask:
             # Pawn moves are high priority for traps
             candidate_moves.append((move, 3))  # High priority
-        elif attacks_near_piece(board, move, piece_square):
+            continue
+        
+        # Each helper settles what it can with bitboards first and only then
+        # asks boards_after for the position after the move, so most
+        # candidates are ranked without ever copying the board
+        if attacks_near_piece(board, move, piece_square):
             candidate_moves.append((move, 2))  # Medium priority
-        elif blocks_escape_route(board, move, piece_square, piece_color):
+        elif blocks_escape_route(board, move, piece_square, piece_color, piece_move_count, boards_after):
             candidate_moves.append((move, 2))  # Medium priority
-        elif creates_pin_or_discovery(board, move, piece_square, piece_color):
+        elif creates_pin_or_discovery(board, move, piece_square, piece_color, boards_after):
             candidate_moves.append((move, 1))  # Lower priority
     
     # Sort by priority and limit to most promising moves
     candidate_moves.sort(key=lambda x: x[1], reverse=True)
-    candidate_moves = [move for move, priority in candidate_moves[:20]]  # Increased limit
+    candidate_moves = candidate_moves[:20]  # Increased limit
     
-    for move in candidate_moves:
-        # Simulate the opponent move
-        board_copy = board.copy()
-        board_copy.push(move)
+    for move, priority in candidate_moves:
+        # Simulate the opponent move (reusing the board if the scan above built it)
+        board_copy = _board_after_reply(board, move, boards_after)
+        
+        # SAN is only needed for the debug lines, so render it once and only then
+        move_san = board.san(move) if debug_mode else None
         
         # Filter out moves that just give check but don't actually trap the piece
         if board_copy.is_check():
             # If the move gives check, verify it also constrains the target piece meaningfully
-            move_san = board.san(move)
             if debug_mode:
                 print(f"[DEBUG] Checking if move {move_san} (which gives check) actually traps piece")
             
-            if not move_actually_traps_piece(board, board_copy, move, piece_square, piece_color):
+            if not move_actually_traps_piece(board, board_copy, move, piece_square, piece_color, debug_mode):
                 if debug_mode:
                     print(f"[DEBUG] Skipping check move {move_san} - doesn't actually trap piece")
                 continue
@@ -386,20 +576,17 @@ def find_trapping_move(board, piece_square, piece_color, debug_mode):
         
         # After opponent's move, check if our piece is truly trapped
         if debug_mode:
-            move_san = board.san(move)
-            piece_name = PIECE_NAMES.get(piece_type, "piece")
-            print(f"[DEBUG] Testing if {move_san} traps {piece_name} on {chess.square_name(piece_square)}")
+            piece_name = PIECE_NAMES_T[piece_type]
+            print(f"[DEBUG] Testing if {move_san} traps {piece_name} on {chess.SQUARE_NAMES[piece_square]}")
             
         if is_piece_truly_trapped(board_copy, piece_square, piece_color, debug_mode):
             if debug_mode:
-                move_san = board.san(move)
-                piece_name = PIECE_NAMES.get(piece_type, "piece")
-                print(f"[DEBUG] Found trapping move: {move_san} traps {piece_name} on {chess.square_name(piece_square)}")
+                print(f"[DEBUG] Found trapping move: {move_san} traps {piece_name} on {chess.SQUARE_NAMES[piece_square]}")
             return move
     
     return None
 
-def move_actually_traps_piece(board_before, board_after, move, piece_square, piece_color):
+def move_actually_traps_piece(board_before, board_after, move, piece_square, piece_color, debug_mode=False):
     """
     Check if a move that gives check actually traps the piece, or just gives check.
     For a check to count as trapping, it should meaningfully limit the piece's mobility.
@@ -412,8 +599,8 @@ def move_actually_traps_piece(board_before, board_after, move, piece_square, pie
     # We need to analyze this from the perspective of the piece owner's turn
     
     # Simulate it being the piece owner's turn in both positions
-    temp_board_before = board_before.copy()
-    temp_board_after = board_after.copy()
+    temp_board_before = board_before.copy(stack=False)
+    temp_board_after = board_after.copy(stack=False)
     
     # If it's not the piece owner's turn, we need to skip a move
     if temp_board_before.turn != piece_color:
@@ -421,122 +608,175 @@ def move_actually_traps_piece(board_before, board_after, move, piece_square, pie
         temp_board_before.turn = piece_color
         temp_board_after.turn = piece_color
     
-    # Count available moves for the specific piece
-    moves_before = 0
-    for potential_move in temp_board_before.legal_moves:
-        if potential_move.from_square == piece_square:
-            moves_before += 1
+    # Count available moves for the specific piece, off the attack tables
+    # where no check or pin can restrict it (callers pass valuable pieces)
+    moves_before = chess.popcount(piece_destinations_mask(temp_board_before, piece_square))
+    moves_after = chess.popcount(piece_destinations_mask(temp_board_after, piece_square))
     
-    moves_after = 0
-    for potential_move in temp_board_after.legal_moves:
-        if potential_move.from_square == piece_square:
-            moves_after += 1
-    
-    # Debug output
-    print(f"[DEBUG] Piece mobility check: {moves_before} moves before -> {moves_after} moves after check")
+    if debug_mode:
+        print(f"[DEBUG] Piece mobility check: {moves_before} moves before -> {moves_after} moves after check")
     
     # Special case: if the piece can't move due to check, this is NOT a trap
     # A real trap should persist even after the check is resolved
     if temp_board_after.is_check():
-        print(f"[DEBUG] Position is in check - piece restrictions likely due to check, not trap")
-        
-        # Try to resolve the check and see if piece is still trapped
-        king_square = temp_board_after.king(piece_color)
-        check_blocking_moves = []
-        
-        # Count moves that block or resolve check
-        for test_move in temp_board_after.legal_moves:
-            test_board = temp_board_after.copy()
-            test_board.push(test_move)
-            if not test_board.is_check():
-                check_blocking_moves.append(test_move)
+        if debug_mode:
+            print(f"[DEBUG] Position is in check - piece restrictions likely due to check, not trap")
         
-        if len(check_blocking_moves) > 0:
-            print(f"[DEBUG] Check can be resolved - not a trap scenario")
+        # Try to resolve the check and see if piece is still trapped.
+        # gives_check() probes each reply in place, so no board copy per move,
+        # and any() stops at the first reply that resolves the check.
+        check_resolvable = any(
+            not temp_board_after.gives_check(test_move)
+            for test_move in temp_board_after.legal_moves
+        )
+
+        if check_resolvable:
+            if debug_mode:
+                print(f"[DEBUG] Check can be resolved - not a trap scenario")
             return False
     
     # If the piece can't move at all after the opponent move AND it's not due to check, it might be trapped
     if moves_after == 0 and moves_before > 0:
-        print(f"[DEBUG] Piece has no moves after opponent move - considering trapped")
+        if debug_mode:
+            print(f"[DEBUG] Piece has no moves after opponent move - considering trapped")
         return True
     
     # If the move significantly reduces available moves (more than 70% reduction), consider it
     if moves_before > 2 and moves_after < moves_before * 0.3:
-        print(f"[DEBUG] Piece mobility significantly reduced - considering trapped")
+        if debug_mode:
+            print(f"[DEBUG] Piece mobility significantly reduced - considering trapped")
         return True
     
     # Otherwise, it's probably just a check or minor constraint, not a trap
-    print(f"[DEBUG] Piece mobility not significantly affected - not trapped")
+    if debug_mode:
+        print(f"[DEBUG] Piece mobility not significantly affected - not trapped")
     return False
 
-def attacks_near_piece(board, move, piece_square):
+def attacks_mask_after_move(board, move):
+    """
+    Squares the moving piece attacks from move.to_square once move is played,
+    read straight off the attack tables instead of copying and pushing.
+    Only sliders depend on occupancy, and for them the move just vacates
+    from_square and fills to_square (castling and en passant move a king or pawn).
+    """
+    to_square = move.to_square
+    piece_type = move.promotion or board.piece_type_at(move.from_square)
+    if piece_type == chess.PAWN:
+        return chess.BB_PAWN_ATTACKS[board.color_at(move.from_square)][to_square]
+    if piece_type == chess.KNIGHT:
+        return chess.BB_KNIGHT_ATTACKS[to_square]
+    if piece_type == chess.KING:
+        return chess.BB_KING_ATTACKS[to_square]
+    
+    occupied = (board.occupied & ~chess.BB_SQUARES[move.from_square]) | chess.BB_SQUARES[to_square]
+    attacks = 0
+    if piece_type in (chess.BISHOP, chess.QUEEN):
+        attacks |= chess.BB_DIAG_ATTACKS[to_square][chess.BB_DIAG_MASKS[to_square] & occupied]
+    if piece_type in (chess.ROOK, chess.QUEEN):
+        attacks |= (chess.BB_RANK_ATTACKS[to_square][chess.BB_RANK_MASKS[to_square] & occupied] |
+                    chess.BB_FILE_ATTACKS[to_square][chess.BB_FILE_MASKS[to_square] & occupied])
+    return attacks
+
+def piece_destinations_mask(board, square):
+    """
+    Squares the piece on square can legally move to, as a bitboard.
+    For a knight, bishop, rook or queen of the side to move that is neither
+    in check nor pinned, every attacked square not holding one of its own
+    pieces is a legal destination, so the attack tables answer directly.
+    Anything else (pawns, kings, checks, pins, the side not to move) goes
+    through move generation. Only meant for counting non-pawn moves, since
+    a pawn's promotions share one destination.
+    """
+    square_mask = chess.BB_SQUARES[square]
+    own_pieces = board.occupied_co[board.turn]
+    if (own_pieces & square_mask and
+            board.piece_type_at(square) in {chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN} and
+            not board.is_check() and not board.is_pinned(board.turn, square)):
+        return board.attacks_mask(square) & ~own_pieces
+    
+    destinations = 0
+    for move in board.generate_legal_moves(square_mask):
+        destinations |= chess.BB_SQUARES[move.to_square]
+    return destinations
+
+def piece_mobility(board, square, color):
+    """
+    Number of squares the piece on square could move to if color were to move.
+    The trap detectors ask this on positions where the opponent is to move,
+    so the turn is flipped on a copy when needed.
+    """
+    if board.turn != color:
+        board = board.copy(stack=False)
+        board.turn = color
+    return chess.popcount(piece_destinations_mask(board, square))
+
+def attacks_near_piece(board, move, piece_square, board_after_move=None):
     """Check if move attacks squares adjacent to or near the piece"""
-    board_copy = board.copy()
-    board_copy.push(move)
-    
-    # Check if the move attacks squares around the piece
-    moving_piece = board_copy.piece_at(move.to_square)
-    if not moving_piece:
-        return False
-    
-    attacks = board_copy.attacks(move.to_square)
-    
-    # Check squares around the piece
-    file = chess.square_file(piece_square)
-    rank = chess.square_rank(piece_square)
-    
-    nearby_squares = []
-    for df in [-1, 0, 1]:
-        for dr in [-1, 0, 1]:
-            new_file = file + df
-            new_rank = rank + dr
-            if 0 <= new_file <= 7 and 0 <= new_rank <= 7:
-                nearby_squares.append(chess.square(new_file, new_rank))
-    
-    return any(sq in attacks for sq in nearby_squares)
+    # The piece's square and its ring of neighbors, as one mask
+    nearby_squares = chess.BB_KING_ATTACKS[piece_square] | chess.BB_SQUARES[piece_square]
+    
+    # Use the position after the move if the caller already has it; the
+    # attack tables give the same answer without building one
+    if board_after_move is not None:
+        return bool(board_after_move.attacks_mask(move.to_square) & nearby_squares)
+    return bool(attacks_mask_after_move(board, move) & nearby_squares)
 
-def blocks_escape_route(board, move, piece_square, piece_color):
-    """Check if move blocks potential escape routes for the piece"""
+def blocks_escape_route(board, move, piece_square, piece_color, piece_move_count=None, boards_after=None):
+    """
+    Check if move blocks potential escape routes for the piece.
+    boards_after is an optional move -> resulting board memo (see find_trapping_move).
+    """
     # More sophisticated check for blocking escape routes
-    piece = board.piece_at(piece_square)
-    if not piece:
+    piece_mask = chess.BB_SQUARES[piece_square]
+    if not board.occupied & piece_mask:
         return False
     
-    # Get the piece's current legal moves
-    piece_moves = []
-    for legal_move in board.legal_moves:
-        if legal_move.from_square == piece_square:
-            piece_moves.append(legal_move.to_square)
-    
-    # Simulate the opponent move
-    board_copy = board.copy()
-    board_copy.push(move)
+    # A move that places a piece near the target could block escape whatever
+    # it does to the piece's mobility, so that's settled before any copy
+    distance = abs(chess.square_file(move.to_square) - chess.square_file(piece_square)) + \
+               abs(chess.square_rank(move.to_square) - chess.square_rank(piece_square))
+    if distance <= 2:
+        return True
     
-    # Get the piece's legal moves after the opponent move
-    piece_moves_after = []
-    for legal_move in board_copy.legal_moves:
-        if legal_move.from_square == piece_square:
-            piece_moves_after.append(legal_move.to_square)
+    # Count the piece's current legal moves (callers scanning many candidate
+    # moves pass this in, since it doesn't change between candidates)
+    if piece_move_count is None:
+        piece_move_count = piece_mobility(board, piece_square, piece_color)
     
     # Check if the move significantly reduces the piece's mobility
-    if len(piece_moves) > 0 and len(piece_moves_after) < len(piece_moves) * 0.5:
-        return True
-    
-    # Check if the move places a piece near the target that could block escape
-    distance = abs(chess.square_file(move.to_square) - chess.square_file(piece_square)) + \
-               abs(chess.square_rank(move.to_square) - chess.square_rank(piece_square))
+    if piece_move_count > 0:
+        board_copy = _board_after_reply(board, move, boards_after)
+        moves_after = chess.popcount(piece_destinations_mask(board_copy, piece_square))
+        if moves_after < piece_move_count * 0.5:
+            return True
     
-    return distance <= 2
+    return False
 
-def creates_pin_or_discovery(board, move, piece_square, piece_color):
-    """Check if move creates a pin or discovered attack on the target piece"""
-    board_copy = board.copy()
-    board_copy.push(move)
+def creates_pin_or_discovery(board, move, piece_square, piece_color, boards_after=None):
+    """
+    Check if move creates a pin or discovered attack on the target piece.
+    boards_after is an optional move -> resulting board memo (see find_trapping_move).
+    """
+    # An attack that is already there can't be newly created
+    if board.is_attacked_by(not piece_color, piece_square):
+        return False
+    
+    # A new attack needs either the moved piece to line up with the target
+    # (ray or knight jump from its new square) or the vacated square to sit on
+    # a ray to the target, uncovering a slider. Castling and en passant move or
+    # remove a second piece, so those always get the full check below
+    if (move.to_square != piece_square and
+            not board.is_castling(move) and not board.is_en_passant(move) and
+            not chess.BB_RAYS[move.from_square][piece_square] and
+            not chess.BB_RAYS[move.to_square][piece_square] and
+            not chess.BB_KNIGHT_ATTACKS[move.to_square] & chess.BB_SQUARES[piece_square]):
+        return False
+    
+    board_copy = _board_after_reply(board, move, boards_after)
     
     # Check if the move creates a discovered attack on the piece
     # This is a simplified check - we look for moves that might reveal an attack
-    moving_piece = board_copy.piece_at(move.to_square)
-    if not moving_piece:
+    if not board_copy.occupied & chess.BB_SQUARES[move.to_square]:
         return False
     
     # Check if the move reveals an attack on the piece
@@ -556,19 +796,18 @@ def is_piece_truly_trapped(board, piece_square, piece_color, debug_mode):
     if not piece or piece.color != piece_color:
         return False
     
-    piece_value = PIECE_VALUES.get(piece.piece_type, 0)
+    piece_value = PIECE_VALUES_T[piece.piece_type]
     piece_type = piece.piece_type
     
     # Special handling for pieces that can't really be "trapped" in normal sense
-    if piece_type == chess.ROOK and piece_square in [chess.A1, chess.H1, chess.A8, chess.H8]:
+    if piece_type == chess.ROOK and chess.BB_CORNERS & chess.BB_SQUARES[piece_square]:
         # Rooks on back rank corner squares are very hard to trap
         return False
     
-    # Get all legal moves for this piece
-    piece_moves = []
-    for move in board.legal_moves:
-        if move.from_square == piece_square:
-            piece_moves.append(move)
+    # Get every square this piece can legally move to (a pawn's promotions
+    # share one square, but a pawn is never valuable enough to count as
+    # trapped unless it has no moves at all)
+    piece_moves = list(chess.scan_forward(piece_destinations_mask(board, piece_square)))
     
     if len(piece_moves) == 0:
         return True  # No legal moves = trapped
@@ -580,41 +819,36 @@ def is_piece_truly_trapped(board, piece_square, piece_color, debug_mode):
     safe_moves = 0
     unsafe_moves = 0
     very_unsafe_moves = 0  # Moves that lose significant material
+    opponent_color = not piece_color
+    total_moves = len(piece_moves)
     
-    for move in piece_moves:
-        to_square = move.to_square
-        
+    for to_square in piece_moves:
         # Check who attacks this destination square
-        attackers = board.attackers(not piece_color, to_square)
+        attackers = board.attackers_mask(opponent_color, to_square)
         
         if not attackers:
             safe_moves += 1  # No attackers = safe move
+            # Once more than half the moves are safe, none of the trap criteria
+            # below can hold, so the remaining destinations need no evaluation
+            if not debug_mode and 2 * safe_moves > total_moves:
+                return False
             continue
         
         # Find cheapest attacker value
-        cheapest_attacker_value = min(
-            PIECE_VALUES.get(board.piece_at(sq).piece_type, 0) 
-            for sq in attackers
-        )
-        
-        # Check if defended adequately
-        defenders = board.attackers(piece_color, to_square)
+        cheapest_attacker_value = least_valuable_attacker_value(board, attackers)
         
         # For a move to be "trapped", the piece must be captured by something strictly cheaper
         if cheapest_attacker_value < piece_value:
+            # Check if defended adequately (only matters when the attacker is cheaper)
+            defenders = board.attackers_mask(piece_color, to_square)
             if not defenders:
                 unsafe_moves += 1  # Undefended and attacked by cheaper piece
                 if piece_value - cheapest_attacker_value > 200:  # Significant loss
                     very_unsafe_moves += 1
                 if debug_mode:
-                    print(f"[DEBUG]   Move to {chess.square_name(to_square)}: UNSAFE (attacked by {cheapest_attacker_value}-value piece, undefended)")
+                    print(f"[DEBUG]   Move to {chess.SQUARE_NAMES[to_square]}: UNSAFE (attacked by {cheapest_attacker_value}-value piece, undefended)")
             else:
                 # Even if defended, if cheapest attacker is much cheaper, it's still unsafe
-                cheapest_defender_value = min(
-                    PIECE_VALUES.get(board.piece_at(sq).piece_type, 0) 
-                    for sq in defenders
-                )
-                
                 # Calculate the exchange value: we lose our piece but opponent loses their attacker
                 # If defended, we can recapture, so we lose our piece but gain their attacker
                 net_loss = piece_value - cheapest_attacker_value
@@ -624,19 +858,19 @@ def is_piece_truly_trapped(board, piece_square, piece_color, debug_mode):
                     unsafe_moves += 1
                     very_unsafe_moves += 1
                     if debug_mode:
-                        print(f"[DEBUG]   Move to {chess.square_name(to_square)}: UNSAFE (net loss: {net_loss} after recapture)")
+                        print(f"[DEBUG]   Move to {chess.SQUARE_NAMES[to_square]}: UNSAFE (net loss: {net_loss} after recapture)")
                 else:
                     safe_moves += 1  # Acceptable exchange
                     if debug_mode:
-                        print(f"[DEBUG]   Move to {chess.square_name(to_square)}: SAFE (net loss: {net_loss} acceptable)")
+                        print(f"[DEBUG]   Move to {chess.SQUARE_NAMES[to_square]}: SAFE (net loss: {net_loss} acceptable)")
         else:
             safe_moves += 1  # Equal or favorable exchange potential
             if debug_mode:
-                print(f"[DEBUG]   Move to {chess.square_name(to_square)}: SAFE (equal/favorable exchange)")
+                print(f"[DEBUG]   Move to {chess.SQUARE_NAMES[to_square]}: SAFE (equal/favorable exchange)")
     
     if debug_mode and piece:
-        piece_name = PIECE_NAMES.get(piece.piece_type, "piece")
-        print(f"[DEBUG] Trap analysis for {piece_name} on {chess.square_name(piece_square)}: {safe_moves} safe, {unsafe_moves} unsafe, {very_unsafe_moves} very unsafe out of {len(piece_moves)} total")
+        piece_name = PIECE_NAMES_T[piece.piece_type]
+        print(f"[DEBUG] Trap analysis for {piece_name} on {chess.SQUARE_NAMES[piece_square]}: {safe_moves} safe, {unsafe_moves} unsafe, {very_unsafe_moves} very unsafe out of {len(piece_moves)} total")
     
     # Updated trap criteria to match Chess.com:
     # 1. If piece has no safe moves and at least 2 unsafe moves
@@ -644,7 +878,6 @@ def is_piece_truly_trapped(board, piece_square, piece_color, debug_mode):
     # 3. If piece has significant unsafe moves (more than 50% very unsafe)
     # 4. Piece value must be significant (at least a minor piece)
     
-    total_moves = len(piece_moves)
     unsafe_percentage = unsafe_moves / total_moves if total_moves > 0 else 0
     very_unsafe_percentage = very_unsafe_moves / total_moves if total_moves > 0 else 0
     
@@ -658,22 +891,23 @@ def is_piece_truly_trapped(board, piece_square, piece_color, debug_mode):
     )
     
     if debug_mode and is_trapped:
-        piece_name = PIECE_NAMES.get(piece.piece_type, "piece")
-        print(f"[DEBUG] CONFIRMED TRAP: {piece_name} on {chess.square_name(piece_square)} - {safe_moves} safe, {unsafe_moves} unsafe, {very_unsafe_moves} very unsafe")
+        piece_name = PIECE_NAMES_T[piece.piece_type]
+        print(f"[DEBUG] CONFIRMED TRAP: {piece_name} on {chess.SQUARE_NAMES[piece_square]} - {safe_moves} safe, {unsafe_moves} unsafe, {very_unsafe_moves} very unsafe")
     
     return is_trapped
 
-def detect_pawn_trap(board, piece_square, piece_color, debug_mode):
+def _detect_pawn_move_trap(board, piece_square, piece_color, debug_mode, mobility_ratio, trap_label):
     """
-    Detect if a piece can be trapped by a pawn move.
-    This matches Chess.com's specific trap detection for pawn moves like b4, b5 that block escape routes.
+    Shared pawn-trap scan behind detect_pawn_trap and detect_chesscom_traps.
+    A nearby opponent pawn move traps the piece if it leaves fewer than
+    mobility_ratio of the piece's moves and every remaining one is unsafe.
     """
     piece = board.piece_at(piece_square)
     if not piece or piece.color != piece_color:
         return None
     
     piece_type = piece.piece_type
-    piece_value = PIECE_VALUES.get(piece_type, 0)
+    piece_value = PIECE_VALUES_T[piece_type]
     
     # Only check significant pieces (knights, bishops, rooks, queens)
     if piece_value < 300:
@@ -681,83 +915,70 @@ def detect_pawn_trap(board, piece_square, piece_color, debug_mode):
     
     opponent_color = not piece_color
     
-    # Get the piece's current legal moves
-    piece_moves = []
-    for move in board.legal_moves:
-        if move.from_square == piece_square:
-            piece_moves.append(move.to_square)
+    # Count the piece's current legal moves (only the count is used)
+    piece_move_count = chess.popcount(piece_destinations_mask(board, piece_square))
     
-    if len(piece_moves) == 0:
+    if piece_move_count == 0:
         return None  # Already has no moves
     
     # Look for specific pawn moves that could trap this piece
-    # Focus on pawn moves that are most likely to create the types of traps Chess.com detects
-    for move in board.legal_moves:
-        moving_piece = board.piece_at(move.from_square)
-        if not moving_piece or moving_piece.color != opponent_color or moving_piece.piece_type != chess.PAWN:
-            continue
-        
-        # Only consider pawn moves that are close to the piece or could block its escape
-        pawn_file = chess.square_file(move.from_square)
-        pawn_rank = chess.square_rank(move.from_square)
-        piece_file = chess.square_file(piece_square)
-        piece_rank = chess.square_rank(piece_square)
-        
-        # Check if this pawn move is relevant to the piece's position
-        # Pawn moves that are too far from the piece are unlikely to trap it
-        file_distance = abs(pawn_file - piece_file)
-        rank_distance = abs(pawn_rank - piece_rank)
-        
-        # Only consider pawn moves that are close to the piece or could block its escape
-        if file_distance > 2 and rank_distance > 2:
-            continue
-        
-        # Simulate the pawn move
-        board_copy = board.copy()
-        board_copy.push(move)
-        
-        # Check if this pawn move significantly reduces the piece's mobility
-        piece_moves_after = []
-        for legal_move in board_copy.legal_moves:
-            if legal_move.from_square == piece_square:
-                piece_moves_after.append(legal_move.to_square)
-        
-        # For a pawn trap to be significant, it should block most escape routes
-        if len(piece_moves_after) < len(piece_moves) * 0.4:  # 60% reduction in mobility
-            # Check if the remaining moves are all unsafe
-            all_unsafe = True
-            for to_square in piece_moves_after:
-                attackers = board_copy.attackers(opponent_color, to_square)
-                if not attackers:
-                    all_unsafe = False
-                    break
-                
-                # Check if the piece can be captured by a cheaper piece
-                cheapest_attacker_value = min(
-                    PIECE_VALUES.get(board_copy.piece_at(sq).piece_type, 0) 
-                    for sq in attackers
-                )
-                
-                if cheapest_attacker_value >= piece_value:
-                    all_unsafe = False
-                    break
+    # Focus on pawn moves that are most likely to create the types of traps Chess.com detects.
+    # Only pawn moves close to the piece (within two files or two ranks) can
+    # block its escape; pawns too far away are unlikely to trap it. So only
+    # the opponent's pawns standing in that zone have their moves generated
+    # (listed up front, since the loop pushes and pops the board itself)
+    nearby_pawns = board.pieces_mask(chess.PAWN, opponent_color) & BB_PAWN_TRAP_ZONE[piece_square]
+    for move in list(board.generate_legal_moves(nearby_pawns)):
+        # Simulate the pawn move in place; pop() puts the board back, so
+        # no copy is needed
+        board.push(move)
+        try:
+            # Check if this pawn move significantly reduces the piece's mobility
+            piece_moves_after = list(chess.scan_forward(piece_destinations_mask(board, piece_square)))
             
+            # For a pawn trap to be significant, it should block most escape routes
+            all_unsafe = len(piece_moves_after) < piece_move_count * mobility_ratio
             if all_unsafe:
-                pawn_move_san = board.san(move)
-                piece_name = PIECE_NAMES.get(piece_type, "piece")
-                
-                if debug_mode:
-                    print(f"[DEBUG] PAWN TRAP DETECTED: {piece_name} on {chess.square_name(piece_square)} can be trapped by {pawn_move_san}")
-                
-                return {
-                    "trapping_move": move,
-                    "trapping_move_san": pawn_move_san,
-                    "piece_name": piece_name,
-                    "piece_square": chess.square_name(piece_square)
-                }
+                # Check if the remaining moves are all unsafe
+                for to_square in piece_moves_after:
+                    attackers = board.attackers_mask(opponent_color, to_square)
+                    if not attackers:
+                        all_unsafe = False
+                        break
+                    
+                    # Check if the piece can be captured by a cheaper piece
+                    cheapest_attacker_value = least_valuable_attacker_value(board, attackers)
+                    
+                    if cheapest_attacker_value >= piece_value:
+                        all_unsafe = False
+                        break
+        finally:
+            board.pop()
+        
+        if all_unsafe:
+            pawn_move_san = board.san(move)
+            piece_name = PIECE_NAMES_T[piece_type]
+            
+            if debug_mode:
+                print(f"[DEBUG] {trap_label} DETECTED: {piece_name} on {chess.SQUARE_NAMES[piece_square]} can be trapped by {pawn_move_san}")
+            
+            return {
+                "trapping_move": move,
+                "trapping_move_san": pawn_move_san,
+                "piece_name": piece_name,
+                "piece_square": chess.SQUARE_NAMES[piece_square]
+            }
     
     return None
 
+def detect_pawn_trap(board, piece_square, piece_color, debug_mode):
+    """
+    Detect if a piece can be trapped by a pawn move.
+    This matches Chess.com's specific trap detection for pawn moves like b4, b5 that block escape routes.
+    """
+    # 60% reduction in mobility
+    return _detect_pawn_move_trap(board, piece_square, piece_color, debug_mode, 0.4, "PAWN TRAP")
+
 def detect_chesscom_traps(board, piece_square, piece_color, debug_mode):
     """
     Detect specific traps that match Chess.com's analysis.
@@ -765,92 +986,51 @@ def detect_chesscom_traps(board, piece_square, piece_color, debug_mode):
     - Knight traps by pawn moves like b5
     - Queen traps by pawn moves like b4
     """
-    piece = board.piece_at(piece_square)
-    if not piece or piece.color != piece_color:
+    # 50% reduction in mobility
+    return _detect_pawn_move_trap(board, piece_square, piece_color, debug_mode, 0.5, "CHESS.COM TRAP")
+
+def _detect_hardcoded_trap(board, piece_type, piece_square, debug_mode, trap_label):
+    """
+    Shared lookup behind detect_chesscom_specific_traps and detect_chesscom_exact_traps.
+    Only the (piece type, square) pairs in CHESSCOM_TRAP_TABLE are tested; the
+    piece is trapped if its pawn push is legal and leaves it with no moves.
+    """
+    trapping_move = CHESSCOM_TRAP_TABLE.get((piece_type, piece_square))
+    if trapping_move is None:
         return None
     
-    piece_type = piece.piece_type
-    piece_value = PIECE_VALUES.get(piece_type, 0)
+    piece_name = PIECE_NAMES_T[piece_type]
+    square_name = chess.SQUARE_NAMES[piece_square]
+    trapping_move_san = chess.SQUARE_NAMES[trapping_move.to_square]  # a plain pawn push
     
-    # Only check significant pieces (knights, bishops, rooks, queens)
-    if piece_value < 300:
+    if debug_mode:
+        print(f"[DEBUG] Found {piece_name.lower()} on {square_name}, checking if {trapping_move_san} is legal")
+    if not board.is_legal(trapping_move):
+        if debug_mode:
+            print(f"[DEBUG] {trapping_move_san} is not legal")
         return None
     
-    opponent_color = not piece_color
-    piece_file = chess.square_file(piece_square)
-    piece_rank = chess.square_rank(piece_square)
+    # Simulate the push in place and see where the piece can still go
+    board.push(trapping_move)
+    try:
+        piece_moves = list(chess.scan_forward(piece_destinations_mask(board, piece_square)))
+    finally:
+        board.pop()
     
-    # Get the piece's current legal moves
-    piece_moves = []
-    for move in board.legal_moves:
-        if move.from_square == piece_square:
-            piece_moves.append(move.to_square)
-    
-    if len(piece_moves) == 0:
-        return None  # Already has no moves
-    
-    # Look for specific pawn moves that could trap this piece
-    for move in board.legal_moves:
-        moving_piece = board.piece_at(move.from_square)
-        if not moving_piece or moving_piece.color != opponent_color or moving_piece.piece_type != chess.PAWN:
-            continue
-        
-        pawn_file = chess.square_file(move.from_square)
-        pawn_rank = chess.square_rank(move.from_square)
-        
-        # Check if this pawn move is relevant to the piece's position
-        file_distance = abs(pawn_file - piece_file)
-        rank_distance = abs(pawn_rank - piece_rank)
-        
-        # Only consider pawn moves that are close to the piece or could block its escape
-        if file_distance > 2 and rank_distance > 2:
-            continue
-        
-        # Simulate the pawn move
-        board_copy = board.copy()
-        board_copy.push(move)
-        
-        # Check if this pawn move significantly reduces the piece's mobility
-        piece_moves_after = []
-        for legal_move in board_copy.legal_moves:
-            if legal_move.from_square == piece_square:
-                piece_moves_after.append(legal_move.to_square)
-        
-        # For a pawn trap to be significant, it should block most escape routes
-        if len(piece_moves_after) < len(piece_moves) * 0.5:  # 50% reduction in mobility
-            # Check if the remaining moves are all unsafe
-            all_unsafe = True
-            for to_square in piece_moves_after:
-                attackers = board_copy.attackers(opponent_color, to_square)
-                if not attackers:
-                    all_unsafe = False
-                    break
-                
-                # Check if the piece can be captured by a cheaper piece
-                cheapest_attacker_value = min(
-                    PIECE_VALUES.get(board_copy.piece_at(sq).piece_type, 0) 
-                    for sq in attackers
-                )
-                
-                if cheapest_attacker_value >= piece_value:
-                    all_unsafe = False
-                    break
-            
-            if all_unsafe:
-                pawn_move_san = board.san(move)
-                piece_name = PIECE_NAMES.get(piece_type, "piece")
-                
-                if debug_mode:
-                    print(f"[DEBUG] CHESS.COM TRAP DETECTED: {piece_name} on {chess.square_name(piece_square)} can be trapped by {pawn_move_san}")
-                
-                return {
-                    "trapping_move": move,
-                    "trapping_move_san": pawn_move_san,
-                    "piece_name": piece_name,
-                    "piece_square": chess.square_name(piece_square)
-                }
+    if debug_mode:
+        print(f"[DEBUG] After {trapping_move_san}, {piece_name.lower()} can move to: {[chess.SQUARE_NAMES[sq] for sq in piece_moves]}")
     
-    return None
+    # If the piece has no moves left, it's trapped
+    if piece_moves:
+        return None
+    if debug_mode:
+        print(f"[DEBUG] {trap_label}: {piece_name} on {square_name} trapped by {trapping_move_san}")
+    return {
+        "trapping_move": trapping_move,
+        "trapping_move_san": trapping_move_san,
+        "piece_name": piece_name,
+        "piece_square": square_name
+    }
 
 def detect_chesscom_specific_traps(board, piece_square, piece_color, debug_mode):
     """
@@ -862,91 +1042,45 @@ def detect_chesscom_specific_traps(board, piece_square, piece_color, debug_mode)
         return None
     
     piece_type = piece.piece_type
-    piece_file = chess.square_file(piece_square)
-    piece_rank = chess.square_rank(piece_square)
-    
-    # Check for specific traps that Chess.com identifies:
-    
-    # 1. Knight on c4 trapped by b5 (Chess.com move 16)
-    if piece_type == chess.KNIGHT and piece_square == chess.C4:
-        # Check if black can play b5 to trap the knight
-        if board.is_legal(chess.Move.from_uci('b7b5')):
-            # Simulate b5
-            board_copy = board.copy()
-            board_copy.push(chess.Move.from_uci('b7b5'))
-            
-            # Check if knight has no safe moves after b5
-            knight_moves = []
-            for move in board_copy.legal_moves:
-                if move.from_square == chess.C4:
-                    knight_moves.append(move.to_square)
-            
-            # If knight has no safe moves, it's trapped
-            if len(knight_moves) == 0:
-                if debug_mode:
-                    print(f"[DEBUG] CHESS.COM SPECIFIC TRAP: Knight on c4 trapped by b5")
-                return {
-                    "trapping_move": chess.Move.from_uci('b7b5'),
-                    "trapping_move_san": "b5",
-                    "piece_name": "Knight",
-                    "piece_square": "c4"
-                }
     
-    # 2. Queen on c3 trapped by b4 (Chess.com moves 18 and 20)
-    if piece_type == chess.QUEEN and piece_square == chess.C3:
-        # Check if black can play b4 to trap the queen
-        if board.is_legal(chess.Move.from_uci('b5b4')):
-            # Simulate b4
-            board_copy = board.copy()
-            board_copy.push(chess.Move.from_uci('b5b4'))
-            
-            # Check if queen has no safe moves after b4
-            queen_moves = []
-            for move in board_copy.legal_moves:
-                if move.from_square == chess.C3:
-                    queen_moves.append(move.to_square)
-            
-            # If queen has no safe moves, it's trapped
-            if len(queen_moves) == 0:
-                if debug_mode:
-                    print(f"[DEBUG] CHESS.COM SPECIFIC TRAP: Queen on c3 trapped by b4")
-                return {
-                    "trapping_move": chess.Move.from_uci('b5b4'),
-                    "trapping_move_san": "b4",
-                    "piece_name": "Queen",
-                    "piece_square": "c3"
-                }
+    # Check for the specific traps that Chess.com identifies
+    hardcoded_trap = _detect_hardcoded_trap(board, piece_type, piece_square, debug_mode,
+                                            "CHESS.COM SPECIFIC TRAP")
+    if hardcoded_trap:
+        return hardcoded_trap
     
-    # 3. More sophisticated trap detection - check if piece can be trapped by multiple moves
-    if piece_type in [chess.KNIGHT, chess.QUEEN, chess.BISHOP, chess.ROOK]:
+    # More sophisticated trap detection - check if piece can be trapped by multiple moves
+    if piece_type in {chess.KNIGHT, chess.QUEEN, chess.BISHOP, chess.ROOK}:
         # Check if there's a sequence of moves that can trap this piece
         opponent_color = not piece_color
         
-        # Get all opponent moves
-        for move in board.legal_moves:
-            moving_piece = board.piece_at(move.from_square)
-            if not moving_piece or moving_piece.color != opponent_color:
-                continue
-            
-            # Simulate the move
-            board_copy = board.copy()
-            board_copy.push(move)
-            
-            # Check if this move significantly reduces the piece's mobility
-            original_moves = len([m for m in board.legal_moves if m.from_square == piece_square])
-            new_moves = len([m for m in board_copy.legal_moves if m.from_square == piece_square])
+        # The piece's current mobility is the same for every candidate move,
+        # so count it once
+        original_moves = chess.popcount(piece_destinations_mask(board, piece_square))
+        
+        # Get all opponent moves, generated from the opponent's squares only
+        # (listed up front, since the loop pushes and pops the board itself)
+        for move in list(board.generate_legal_moves(board.occupied_co[opponent_color])):
+            # Simulate the move in place; pop() restores the board, so no copy is needed
+            board.push(move)
+            try:
+                # Check if this move significantly reduces the piece's mobility
+                new_moves = chess.popcount(piece_destinations_mask(board, piece_square))
+            finally:
+                board.pop()
             
             # If mobility is significantly reduced and piece is valuable, consider it a trap
             if new_moves < original_moves * 0.5 and new_moves <= 2:
-                piece_value = PIECE_VALUES.get(piece_type, 0)
+                piece_value = PIECE_VALUES_T[piece_type]
                 if piece_value >= 300:  # At least a knight
+                    move_san = board.san(move)
                     if debug_mode:
-                        print(f"[DEBUG] SOPHISTICATED TRAP: {piece_type} on {chess.square_name(piece_square)} trapped by {board.san(move)}")
+                        print(f"[DEBUG] SOPHISTICATED TRAP: {piece_type} on {chess.SQUARE_NAMES[piece_square]} trapped by {move_san}")
                     return {
                         "trapping_move": move,
-                        "trapping_move_san": board.san(move),
-                        "piece_name": PIECE_NAMES.get(piece_type, "piece"),
-                        "piece_square": chess.square_name(piece_square)
+                        "trapping_move_san": move_san,
+                        "piece_name": PIECE_NAMES_T[piece_type],
+                        "piece_square": chess.SQUARE_NAMES[piece_square]
                     }
     
     return None
@@ -961,94 +1095,22 @@ def detect_chesscom_exact_traps(board, piece_square, piece_color, debug_mode):
         return None
     
     piece_type = piece.piece_type
-    piece_file = chess.square_file(piece_square)
-    piece_rank = chess.square_rank(piece_square)
     
     if debug_mode:
-        print(f"[DEBUG] Checking exact trap for {piece_type} on {chess.square_name(piece_square)}")
-    
-    # Check for the exact traps Chess.com identifies:
+        print(f"[DEBUG] Checking exact trap for {piece_type} on {chess.SQUARE_NAMES[piece_square]}")
     
-    # 1. Knight on c4 trapped by b5 (Chess.com move 16)
-    if piece_type == chess.KNIGHT and piece_square == chess.C4:
-        if debug_mode:
-            print(f"[DEBUG] Found knight on c4, checking if b5 is legal")
-        # Check if black can play b5 to trap the knight
-        if board.is_legal(chess.Move.from_uci('b7b5')):
-            if debug_mode:
-                print(f"[DEBUG] b5 is legal, simulating it")
-            # Simulate b5
-            board_copy = board.copy()
-            board_copy.push(chess.Move.from_uci('b7b5'))
-            
-            # Check if knight has no safe moves after b5
-            knight_moves = []
-            for move in board_copy.legal_moves:
-                if move.from_square == chess.C4:
-                    knight_moves.append(move.to_square)
-            
-            if debug_mode:
-                print(f"[DEBUG] After b5, knight can move to: {[chess.square_name(sq) for sq in knight_moves]}")
-            
-            # If knight has no safe moves, it's trapped
-            if len(knight_moves) == 0:
-                if debug_mode:
-                    print(f"[DEBUG] CHESS.COM EXACT TRAP: Knight on c4 trapped by b5")
-                return {
-                    "trapping_move": chess.Move.from_uci('b7b5'),
-                    "trapping_move_san": "b5",
-                    "piece_name": "Knight",
-                    "piece_square": "c4"
-                }
-        else:
-            if debug_mode:
-                print(f"[DEBUG] b5 is not legal")
-    
-    # 2. Queen on c3 trapped by b4 (Chess.com moves 18 and 20)
-    if piece_type == chess.QUEEN and piece_square == chess.C3:
-        if debug_mode:
-            print(f"[DEBUG] Found queen on c3, checking if b4 is legal")
-        # Check if black can play b4 to trap the queen
-        if board.is_legal(chess.Move.from_uci('b5b4')):
-            if debug_mode:
-                print(f"[DEBUG] b4 is legal, simulating it")
-            # Simulate b4
-            board_copy = board.copy()
-            board_copy.push(chess.Move.from_uci('b5b4'))
-            
-            # Check if queen has no safe moves after b4
-            queen_moves = []
-            for move in board_copy.legal_moves:
-                if move.from_square == chess.C3:
-                    queen_moves.append(move.to_square)
-            
-            if debug_mode:
-                print(f"[DEBUG] After b4, queen can move to: {[chess.square_name(sq) for sq in queen_moves]}")
-            
-            # If queen has no safe moves, it's trapped
-            if len(queen_moves) == 0:
-                if debug_mode:
-                    print(f"[DEBUG] CHESS.COM EXACT TRAP: Queen on c3 trapped by b4")
-                return {
-                    "trapping_move": chess.Move.from_uci('b5b4'),
-                    "trapping_move_san": "b4",
-                    "piece_name": "Queen",
-                    "piece_square": "c3"
-                }
-        else:
-            if debug_mode:
-                print(f"[DEBUG] b4 is not legal")
-    
-    return None
+    return _detect_hardcoded_trap(board, piece_type, piece_square, debug_mode, "CHESS.COM EXACT TRAP")
 
-def check_for_missed_material_gain_optimized(board_before, best_move_info, move_played, state_manager, debug_mode, actual_move_number):
-    """Optimized material gain detection"""
-    if not best_move_info.get('pv'): 
-        return None
-    
-    best_move = best_move_info['pv'][0]
+def check_for_missed_material_gain_optimized(board_before, best_move_info, move_played, state_manager, debug_mode, actual_move_number, san_cache=None, best_move=None):
+    """Optimized material gain detection (best_move may be passed in when the caller already took it off the PV)"""
+    if best_move is None:
+        if not best_move_info.get('pv'): 
+            return None
+        best_move = best_move_info['pv'][0]
     if best_move == move_played:
         return None
+    if san_cache is None:
+        san_cache = SanCache(board_before)
     
     # Only check captures
     if board_before.is_capture(best_move):
@@ -1060,11 +1122,11 @@ def check_for_missed_material_gain_optimized(board_before, best_move_info, move_
             captured_square = best_move.to_square
             
             # Check if completely undefended
-            if captured_square in pos_analysis.hanging_pieces:
+            if pos_analysis.hanging_mask & chess.BB_SQUARES[captured_square]:
                 captured_piece = board_before.piece_at(captured_square)
-                piece_name = PIECE_NAMES.get(captured_piece.piece_type, "material") if captured_piece else "material"
-                best_move_san = board_before.san(best_move)
-                move_played_san = board_before.san(move_played)
+                piece_name = PIECE_NAMES_T[captured_piece.piece_type] if captured_piece else "material"
+                best_move_san = san_cache.before(best_move)
+                move_played_san = san_cache.before(move_played)
                 
                 return {
                     "category": "Missed Material Gain",
@@ -1073,8 +1135,8 @@ def check_for_missed_material_gain_optimized(board_before, best_move_info, move_
                     "missed_value": see_value
                 }
             elif see_value >= 200:  # Significant tactical gain
-                best_move_san = board_before.san(best_move)
-                move_played_san = board_before.san(move_played)
+                best_move_san = san_cache.before(best_move)
+                move_played_san = san_cache.before(move_played)
                 
                 return {
                     "category": "Missed Material Gain",
@@ -1085,23 +1147,24 @@ def check_for_missed_material_gain_optimized(board_before, best_move_info, move_
     
     return None
 
-def check_for_hanging_piece_optimized(board_before, move_played, board_after, turn_color, state_manager, debug_mode, actual_move_number):
+def check_for_hanging_piece_optimized(board_before, move_played, board_after, turn_color, state_manager, debug_mode, actual_move_number, san_cache=None):
     """Optimized hanging piece detection using cached analysis"""
-    move_played_san = board_before.san(move_played)
+    if san_cache is None:
+        san_cache = SanCache(board_before, board_after)
     
-    # Check losing captures first
-    if board_before.is_capture(move_played):
+    # Check losing captures first (see_ge settles most captures without running the exchange)
+    if board_before.is_capture(move_played) and not see_ge(board_before, move_played, -100):
         see_value = see(board_before, move_played)
-        if see_value < -100:
-            captured_piece = board_before.piece_at(move_played.to_square)
-            captured_name = PIECE_NAMES.get(captured_piece.piece_type, "piece") if captured_piece else "piece"
-            
-            return {
-                "category": "Losing Exchange",
-                "move_number": actual_move_number,
-                "description": f"your move {move_played_san} loses material through exchanges (approximately {abs(see_value)} centipawns)",
-                "material_loss": abs(see_value)
-            }
+        captured_piece = board_before.piece_at(move_played.to_square)
+        captured_name = PIECE_NAMES_T[captured_piece.piece_type] if captured_piece else "piece"
+        move_played_san = san_cache.before(move_played)
+        
+        return {
+            "category": "Losing Exchange",
+            "move_number": actual_move_number,
+            "description": f"your move {move_played_san} loses material through exchanges (approximately {abs(see_value)} centipawns)",
+            "material_loss": abs(see_value)
+        }
     
     # Use cached position analysis
     pos_analysis = analyze_position_cached(board_after, state_manager)
@@ -1109,23 +1172,25 @@ def check_for_hanging_piece_optimized(board_before, move_played, board_after, tu
     new_hanging = []
     current_hanging_keys = set()
     
-    for square in pos_analysis.hanging_pieces:
-        piece = board_after.piece_at(square)
-        if piece and piece.color == turn_color:
-            weakness_key = f"hanging_{piece.piece_type}_{square}"
-            current_hanging_keys.add(weakness_key)
+    # Our hanging pieces are one AND of two bitboards, with no per-square
+    # piece lookup or color compare
+    own_pieces = board_after.occupied_co[turn_color]
+    for square in chess.scan_forward(pos_analysis.hanging_mask & own_pieces):
+        piece_type = board_after.piece_type_at(square)
+        weakness_key = ("hanging", piece_type, square)
+        current_hanging_keys.add(weakness_key)
+        
+        # Only report if NEW
+        if state_manager.is_new_weakness(weakness_key):
+            extra_note = " by moving it to an undefended square" if move_played.to_square == square else ""
             
-            # Only report if NEW
-            if state_manager.is_new_weakness(weakness_key):
-                extra_note = " by moving it to an undefended square" if move_played.to_square == square else ""
-                
-                new_hanging.append({
-                    'square': square,
-                    'piece': piece,
-                    'weakness_key': weakness_key,
-                    'piece_value': PIECE_VALUES.get(piece.piece_type, 0),
-                    'extra_note': extra_note
-                })
+            new_hanging.append({
+                'square': square,
+                'piece_type': piece_type,
+                'weakness_key': weakness_key,
+                'piece_value': PIECE_VALUES_T[piece_type],
+                'extra_note': extra_note
+            })
     
     # Update state
     state_manager.remove_resolved_weaknesses(current_hanging_keys)
@@ -1137,15 +1202,16 @@ def check_for_hanging_piece_optimized(board_before, move_played, board_after, tu
         
         weakness = TacticalWeakness(
             weakness_type="hanging",
-            piece_type=worst['piece'].piece_type,
+            piece_type=worst['piece_type'],
             square=worst['square'],
             introduced_at_move=actual_move_number,
-            description=f"{PIECE_NAMES.get(worst['piece'].piece_type, 'piece')} on {chess.square_name(worst['square'])}"
+            description=f"{PIECE_NAMES_T[worst['piece_type']]} on {chess.SQUARE_NAMES[worst['square']]}"
         )
         state_manager.add_weakness(worst['weakness_key'], weakness)
         
-        piece_name = PIECE_NAMES.get(worst['piece'].piece_type, 'piece')
-        square_name = chess.square_name(worst['square'])
+        piece_name = PIECE_NAMES_T[worst['piece_type']]
+        square_name = chess.SQUARE_NAMES[worst['square']]
+        move_played_san = san_cache.before(move_played)
         
         return {
             "category": "Hanging a Piece",
@@ -1158,11 +1224,30 @@ def check_for_hanging_piece_optimized(board_before, move_played, board_after, tu
 
 def quick_heuristics_optimized(board_before, move_played, best_move_info, turn_color, state_manager, debug_mode, opponent_last_move):
     """Ultra-fast heuristics using minimal computation - ENHANCED VERSION (Step 1.2)"""
+    # Every skip below is independent, so they run cheapest first: a bitboard
+    # popcount and the already-fetched eval before any move generation
+    piece_count = chess.popcount(board_before.occupied)
+    
+    # NEW: Skip simple endgames (use tablebase or skip)
+    if SKIP_TABLEBASE_POSITIONS and piece_count <= TABLEBASE_PIECE_LIMIT:
+        if debug_mode:
+            print(f"[DEBUG] Skipping tablebase position ({piece_count} pieces)")
+        return False
+    
+    # EXISTING: Skip quiet endgame positions
+    if board_before.fullmove_number > 30 and piece_count < 10:
+        if best_move_info:
+            eval_cp = best_move_info["score"].pov(turn_color).score(mate_score=10000)
+            if eval_cp is not None and abs(eval_cp) < 100:
+                if debug_mode:
+                    print(f"[DEBUG] Skipping quiet endgame position")
+                return False
     
     # NEW: Skip forced moves
     if SKIP_FORCED_MOVES:
-        legal_moves = list(board_before.legal_moves)
-        if len(legal_moves) == 1:
+        # Only "exactly one" matters, so stop generating after the second move
+        legal_move_count = sum(1 for _ in islice(board_before.generate_legal_moves(), 2))
+        if legal_move_count == 1:
             if debug_mode:
                 print(f"[DEBUG] Skipping forced move (only legal move)")
             return False
@@ -1179,51 +1264,30 @@ def quick_heuristics_optimized(board_before, move_played, best_move_info, turn_c
             print(f"[DEBUG] Skipping obvious recapture")
         return False
     
-    # NEW: Skip simple endgames (use tablebase or skip)
-    if SKIP_TABLEBASE_POSITIONS:
-        piece_count = len(board_before.piece_map())
-        if piece_count <= TABLEBASE_PIECE_LIMIT:
-            if debug_mode:
-                print(f"[DEBUG] Skipping tablebase position ({piece_count} pieces)")
-            return False
-    
-    # EXISTING: Skip quiet endgame positions
-    if board_before.fullmove_number > 30 and piece_count < 10:
-        if best_move_info:
-            eval_cp = best_move_info["score"].pov(turn_color).score(mate_score=10000)
-            if eval_cp is not None and abs(eval_cp) < 100:
-                if debug_mode:
-                    print(f"[DEBUG] Skipping quiet endgame position")
-                return False
-    
-    # Continue with existing checks...
-    # Always analyze tactical positions
-    if board_before.fullmove_number <= 20:  # Opening/middlegame
-        return True
-    
-    # Always analyze if best move is mate or capture
-    if best_move_info:
-        if best_move_info["score"].pov(turn_color).is_mate():
-            return True
-        
-        if best_move_info.get('pv') and board_before.is_capture(best_move_info['pv'][0]):
-            return True
-    
-    # Always analyze our captures and checks
-    if board_before.is_capture(move_played) or board_before.gives_check(move_played):
-        return True
-    
-    return True  # Default to analyzing
+    # Everything else gets analyzed: openings, mates, captures and checks
+    # for both the best move and ours would all return True here, so there
+    # is no need to probe is_capture()/gives_check() to find that out
+    return True
 
 def categorize_blunder_optimized(board_before, board_after, move_played, info_before_move, info_after_move, 
                                 best_move_info, state_manager, debug_mode, actual_move_number):
     """Optimized blunder categorization with LAZY EVALUATION (Step 1.3)"""
-    move_played_san = board_before.san(move_played)
     turn_color = board_before.turn
     
+    # Turn each engine score to our side once and pull the best move out of
+    # the PV once; every check below shares these
+    before_eval = info_before_move["score"].pov(turn_color)
+    after_eval = info_after_move["score"].pov(turn_color)
+    best_eval = best_move_info["score"].pov(turn_color)
+    best_pv = best_move_info.get('pv')
+    best_move = best_pv[0] if best_pv else None
+    # Playing the engine's move can't have missed anything, so the "missed"
+    # checks below are skipped outright rather than each finding that out
+    best_move_is_played = best_move == move_played
+    
     # Calculate win probability drop FIRST
-    eval_before = info_before_move["score"].pov(turn_color).score(mate_score=10000)
-    eval_after = info_after_move["score"].pov(turn_color).score(mate_score=10000)
+    eval_before = before_eval.score(mate_score=10000)
+    eval_after = after_eval.score(mate_score=10000)
     
     # NEW: Early exit if evaluation change is minimal
     if eval_before is not None and eval_after is not None:
@@ -1236,42 +1300,62 @@ def categorize_blunder_optimized(board_before, board_after, move_played, info_be
     # Continue with win probability calculation...
     state_manager.update_eval(eval_after)
     
+    # Constant-folded logistic: without a mate in play, a drop this small
+    # can't pass any win-probability threshold below
+    if (eval_before is not None and eval_after is not None and
+            eval_before - eval_after < MIN_REPORTABLE_EVAL_DROP and
+            not after_eval.is_mate() and not best_eval.is_mate()):
+        return None
+    
+    # One SAN memo per move, shared by every detector below. It's only set up
+    # once the score gates above have passed, and SAN itself is only rendered
+    # once a move is actually reported
+    san_cache = SanCache(board_before, board_after)
+    
     if eval_before is not None and eval_after is not None:
         win_prob_before = cp_to_win_prob(eval_before)
         win_prob_after = cp_to_win_prob(eval_after)
         win_prob_drop = (win_prob_before - win_prob_after) * 100
     else:
-        if info_after_move["score"].pov(turn_color).is_mate():
-            mate_num = info_after_move["score"].pov(turn_color).mate()
+        if after_eval.is_mate():
+            mate_num = after_eval.mate()
             win_prob_drop = 100.0 if mate_num < 0 else 0.0
         else:
             win_prob_drop = 0.0
     
+    # NEW: In the book phase tactical blunders are rare, so the material
+    # detectors don't report and only the eval-based checks and the fallback do
+    in_book_phase = OPENING_DETECTOR_BYPASS and board_before.fullmove_number < OPENING_DETECTOR_CUTOFF_MOVE
+    
     # REORDERED: Check by frequency (most common first) and cost (cheapest first)
     
     # 1. CHEAP CHECK: Hanging pieces (most common, very fast)
+    # This also keeps the hanging-weakness state current, so it still runs in
+    # the book phase; only its report is suppressed there, otherwise a piece
+    # left hanging in the opening would count as new on a later move
     if win_prob_drop >= MISTAKE_THRESHOLD:
         hanging_result = check_for_hanging_piece_optimized(board_before, move_played, board_after, 
-                                                          turn_color, state_manager, debug_mode, actual_move_number)
-        if hanging_result:
+                                                          turn_color, state_manager, debug_mode, actual_move_number, san_cache)
+        if hanging_result and not in_book_phase:
             hanging_result["win_prob_drop"] = win_prob_drop
-            hanging_result["move_san"] = move_played_san
+            hanging_result["move_san"] = san_cache.before(move_played)
             return hanging_result
     
     # 2. CHEAP CHECK: Missed material (common, fast)
-    if win_prob_drop >= MISTAKE_THRESHOLD:
+    if win_prob_drop >= MISTAKE_THRESHOLD and not in_book_phase and best_move and not best_move_is_played:
         missed_material = check_for_missed_material_gain_optimized(board_before, best_move_info, move_played, 
-                                                                  state_manager, debug_mode, actual_move_number)
+                                                                  state_manager, debug_mode, actual_move_number, san_cache,
+                                                                  best_move)
         if missed_material:
             missed_material["win_prob_drop"] = win_prob_drop
-            missed_material["move_san"] = move_played_san
+            missed_material["move_san"] = san_cache.before(move_played)
             return missed_material
     
     # 3. MEDIUM CHECK: Checkmates (less common, medium cost)
-    after_eval = info_after_move["score"].pov(turn_color)
     if after_eval.is_mate() and after_eval.mate() < 0:
         # Only check for new checkmates
         if not state_manager.in_losing_position or abs(after_eval.mate()) <= 1:
+            move_played_san = san_cache.before(move_played)
             mate_result = {
                 "category": "Allowed Checkmate",
                 "move_number": actual_move_number,
@@ -1282,9 +1366,9 @@ def categorize_blunder_optimized(board_before, board_after, move_played, info_be
             return mate_result
     
     # Check missed checkmate
-    best_eval = best_move_info["score"].pov(turn_color)
     if best_eval.is_mate() and best_eval.mate() > 0:
         if not after_eval.is_mate() or (after_eval.is_mate() and after_eval.mate() > best_eval.mate()):
+            move_played_san = san_cache.before(move_played)
             missed_mate_result = {
                 "category": "Missed Checkmate",
                 "move_number": actual_move_number,
@@ -1301,19 +1385,20 @@ def categorize_blunder_optimized(board_before, board_after, move_played, info_be
         win_prob_drop >= EXPENSIVE_CHECK_THRESHOLD and 
         10 <= board_before.fullmove_number <= 30):  # Only check traps in middlegame
         trap_result = detect_trap_optimized(board_before, move_played, board_after, turn_color, 
-                                          state_manager, debug_mode)
+                                          state_manager, debug_mode, san_cache)
         if trap_result:
             trap_result["move_number"] = actual_move_number
             trap_result["win_prob_drop"] = win_prob_drop
-            trap_result["move_san"] = move_played_san
+            trap_result["move_san"] = san_cache.before(move_played)
             return trap_result
     
     # 5. FALLBACK: General mistakes (only if nothing else found)
     if board_before.fullmove_number <= 15:
-        # Opening thresholds...
-        if win_prob_drop >= OPENING_BLUNDER:
+        # Opening thresholds... (stricter still in the book phase)
+        threshold_scale = OPENING_BYPASS_THRESHOLD_SCALE if in_book_phase else 1.0
+        if win_prob_drop >= OPENING_BLUNDER * threshold_scale:
             severity = "Blunder"
-        elif win_prob_drop >= OPENING_MISTAKE:
+        elif win_prob_drop >= OPENING_MISTAKE * threshold_scale:
             severity = "Mistake"
         else:
             return None
@@ -1329,10 +1414,10 @@ def categorize_blunder_optimized(board_before, board_after, move_played, info_be
             return None
     
     # Only create general mistake if we have a better move to suggest
-    if severity in ["Mistake", "Blunder", "Critical blunder"]:
-        best_move = best_move_info['pv'][0] if best_move_info.get('pv') else None
+    if severity in {"Mistake", "Blunder", "Critical blunder"}:
         if best_move:
-            best_move_san = board_before.san(best_move)
+            move_played_san = san_cache.before(move_played)
+            best_move_san = san_cache.before(best_move)
             return {
                 "category": severity,
                 "move_number": actual_move_number,
@@ -1343,12 +1428,42 @@ def categorize_blunder_optimized(board_before, board_after, move_played, info_be
     
     return None
 
+def analyse_request(engine, request):
+    """Run one (board, limit) or (board, limit, root_moves) request on the engine"""
+    board, limit, *root_moves = request
+    return engine.analyse(board, limit, root_moves=root_moves[0] if root_moves else None)
+
+def analysis_limits(think_time):
+    """
+    Search limits for the two requests behind a candidate move. Limits are
+    read-only, so callers build them once per think time and share them.
+    """
+    before_limit = chess.engine.Limit(time=think_time)
+    if ENABLE_ROOT_MOVE_ANALYSIS:
+        return before_limit, chess.engine.Limit(time=think_time * ROOT_MOVE_THINK_TIME_SCALE)
+    return before_limit, before_limit
+
+def analysis_requests_for_move(board_before, board_after, move, limits):
+    """
+    The two engine requests behind one candidate move: the best line from the
+    position before it, then the score of the move actually played. With
+    ENABLE_ROOT_MOVE_ANALYSIS the second search restricts the same root to the
+    played move, so it starts from the hash the first one just filled and gets
+    a shorter limit; otherwise the position after the move is searched afresh.
+    That only holds if both go to the same engine, one after the other, so
+    pipelined callers pass group_size=2. limits is the pair from analysis_limits().
+    """
+    before_limit, after_limit = limits
+    if ENABLE_ROOT_MOVE_ANALYSIS:
+        return (board_before, before_limit), (board_before, after_limit, [move])
+    return (board_before, before_limit), (board_after, after_limit)
+
 def analyze_positions_batch(engine, positions_and_limits, debug_mode):
     """
     Analyze multiple positions in a single batch for efficiency.
     Args:
         engine: Chess engine instance
-        positions_and_limits: List of (board, limit) tuples
+        positions_and_limits: List of (board, limit) or (board, limit, root_moves) tuples
         debug_mode: Debug flag
     Returns:
         List of analysis info objects
@@ -1358,16 +1473,16 @@ def analyze_positions_batch(engine, positions_and_limits, debug_mode):
     # Check if batch analysis is enabled
     if not ENABLE_BATCH_ENGINE_ANALYSIS:
         # Fallback to sequential analysis
-        for board, limit in positions_and_limits:
-            results.append(engine.analyse(board, limit))
+        for request in positions_and_limits:
+            results.append(analyse_request(engine, request))
         return results
     
     # Skip batching for small numbers of positions (overhead not worth it)
     total_positions = len(positions_and_limits)
     if total_positions < 10:
         # Use sequential for small batches
-        for board, limit in positions_and_limits:
-            results.append(engine.analyse(board, limit))
+        for request in positions_and_limits:
+            results.append(analyse_request(engine, request))
         return results
     
     # Process in batches of configured size for larger sets
@@ -1384,13 +1499,59 @@ def analyze_positions_batch(engine, positions_and_limits, debug_mode):
         else:
             # Fallback to sequential with reduced overhead
             batch_results = []
-            for board, limit in batch:
-                batch_results.append(engine.analyse(board, limit))
+            for request in batch:
+                batch_results.append(analyse_request(engine, request))
         
         results.extend(batch_results)
     
     return results
 
+def analyze_positions_pipelined(engine, positions_and_limits, debug_mode, helper_engines=(), errors_as_none=False,
+                                group_size=1):
+    """
+    Analyze positions on background threads and yield results in order.
+    While the engine searches the next position, the caller is free to
+    categorize the previous one, so Python work overlaps engine think time.
+    With helper engines the positions are dealt round-robin across all of
+    them, so several searches run at once on separate cores.
+    Args:
+        engine: Chess engine instance
+        positions_and_limits: List of (board, limit) or (board, limit, root_moves) tuples
+        debug_mode: Debug flag
+        helper_engines: Extra engine instances to share the work with
+        errors_as_none: Yield None for a failed search instead of raising
+        group_size: Deal requests out in runs of this many, so each run goes
+            to one engine and is searched in order (2 keeps the pairs from
+            analysis_requests_for_move together)
+    Yields:
+        Analysis info objects, in the same order as positions_and_limits
+    """
+    engines = [engine, *helper_engines]
+    if debug_mode:
+        print(f"[DEBUG] Pipelining {len(positions_and_limits)} engine analyses over {len(engines)} engine(s)")
+
+    # One single-thread executor per engine keeps each engine to one search at a time
+    executors = [ThreadPoolExecutor(max_workers=1) for _ in engines]
+    futures = []
+    try:
+        for i, request in enumerate(positions_and_limits):
+            engine_index = (i // group_size) % len(engines)
+            futures.append(executors[engine_index].submit(analyse_request, engines[engine_index], request))
+        for future in futures:
+            try:
+                info = future.result()
+            except Exception:
+                if not errors_as_none:
+                    raise
+                info = None
+            yield info
+    finally:
+        # Don't keep the engines busy if the consumer stopped early
+        for future in futures:
+            future.cancel()
+        for executor in executors:
+            executor.shutdown(wait=True)
+
 def analyze_chunk(chunk_data):
     """
     Analyzes a chunk of moves for a single player. This function is designed
@@ -1422,18 +1583,22 @@ def analyze_chunk(chunk_data):
             elif board_before.fullmove_number > 40:
                 think_time *= 0.8
             
-            info_before_move = engine.analyse(board, chess.engine.Limit(time=think_time))
-            best_move_info = info_before_move
-            
+            # Push first so the after-move request is built from the position
+            # after the move, not from a board that only becomes it later
             board.push(move)
             
+            before_request, after_request = analysis_requests_for_move(board_before, board, move,
+                                                                       analysis_limits(think_time))
+            info_before_move = analyse_request(engine, before_request)
+            best_move_info = info_before_move
+            
             needs_analysis = quick_heuristics_optimized(
                 board_before, move, best_move_info, user_color, 
                 state_manager, debug_mode, opponent_last_move
             )
             
             if needs_analysis:
-                info_after_move = engine.analyse(board, chess.engine.Limit(time=think_time))
+                info_after_move = analyse_request(engine, after_request)
                 
                 blunder_info = categorize_blunder_optimized(
                     board_before, board, move, info_before_move, info_after_move,
@@ -1441,7 +1606,7 @@ def analyze_chunk(chunk_data):
                 )
                 
                 if blunder_info:
-                    blunder_key = f"{blunder_info['category']}_{actual_move_number}"
+                    blunder_key = (blunder_info['category'], actual_move_number)
                     if not state_manager.has_reported(blunder_key):
                         blunders.append(blunder_info)
                         state_manager.mark_reported(blunder_key)
@@ -1451,18 +1616,25 @@ def analyze_chunk(chunk_data):
     engine.quit()
     return blunders
 
-def analyze_game_optimized(game, engine, target_user, blunder_threshold, engine_think_time, debug_mode, stockfish_path, threads):
+def user_color_from_headers(headers, target_user) -> Optional[chess.Color]:
+    """Color target_user plays in a game, from its headers alone, or None if they didn't play"""
+    target = target_user.lower()
+    if headers.get("White", "").lower() == target:
+        return chess.WHITE
+    if headers.get("Black", "").lower() == target:
+        return chess.BLACK
+    return None
+
+def analyze_game_optimized(game, engine, target_user, blunder_threshold, engine_think_time, debug_mode, stockfish_path, threads,
+                           helper_engines=()):
     """
     Optimized game analysis with smart engine batching (Phase 1, Step 1.1).
+    helper_engines, if given, search positions alongside engine; categorization
+    stays sequential because the state manager tracks weaknesses move by move.
     """
     blunders = []
     board = game.board()
-    user_color = None
-
-    if game.headers.get("White", "").lower() == target_user.lower():
-        user_color = chess.WHITE
-    elif game.headers.get("Black", "").lower() == target_user.lower():
-        user_color = chess.BLACK
+    user_color = user_color_from_headers(game.headers, target_user)
     
     if user_color is None:
         print(f"User '{target_user}' not found in this game. Skipping.")
@@ -1470,63 +1642,83 @@ def analyze_game_optimized(game, engine, target_user, blunder_threshold, engine_
 
     all_moves = list(game.mainline_moves())
     state_manager = BlunderStateManager()
-    board = game.board()
-    positions_to_analyze = []
-    move_indices = []
-    move_data = []
+    analysis_targets = []
 
-    # First pass: collect all positions that need analysis
+    # First pass: collect all positions that need analysis. The walker board is
+    # pushed in place and each of the user's positions gets a snapshot, so all
+    # the quick searches can be queued up front instead of one round-trip at a time
+    # Turns alternate, so the user's plies are every other one from the first
+    # they move on; no need to ask the board whose turn it is each time
+    user_positions = []
     temp_board = game.board()
-    for move_idx, move in enumerate(all_moves):
-        if temp_board.turn == user_color:
-            # Get a quick best move info for heuristics (minimal think time)
-            try:
-                best_move_info = engine.analyse(temp_board, chess.engine.Limit(time=0.01))
-            except Exception:
-                best_move_info = None
-            if best_move_info is not None:
-                if quick_heuristics_optimized(temp_board, move, best_move_info, user_color, state_manager, debug_mode, temp_board.move_stack[-1] if temp_board.move_stack else None):
-                    positions_to_analyze.append((temp_board.copy(), chess.engine.Limit(time=engine_think_time)))
-                    move_indices.append(move_idx)
-            else:
-                # Fallback: always analyze if we can't get best_move_info
-                positions_to_analyze.append((temp_board.copy(), chess.engine.Limit(time=engine_think_time)))
-                move_indices.append(move_idx)
-        move_data.append((temp_board.copy(), move))
+    first_user_ply = 0 if temp_board.turn == user_color else 1
+    for ply, move in enumerate(all_moves):
+        if ply % 2 == first_user_ply:
+            user_positions.append((temp_board.copy(), move))
         temp_board.push(move)
 
-    # Batch analyze all positions (before and after move for each)
+    # Get a quick best move info for heuristics (minimal think time)
+    quick_limit = chess.engine.Limit(time=0.01)
+    quick_results = None
+    if ENABLE_PIPELINED_ENGINE_ANALYSIS:
+        quick_results = analyze_positions_pipelined(
+            engine, [(board_before, quick_limit) for board_before, _ in user_positions],
+            debug_mode, helper_engines, errors_as_none=True
+        )
+    try:
+        for board_before, move in user_positions:
+            if quick_results is not None:
+                best_move_info = next(quick_results)
+            else:
+                try:
+                    best_move_info = engine.analyse(board_before, quick_limit)
+                except Exception:
+                    best_move_info = None
+            # Fallback: always analyze if we can't get best_move_info
+            if best_move_info is None or quick_heuristics_optimized(board_before, move, best_move_info, user_color, state_manager, debug_mode, board_before.move_stack[-1] if board_before.move_stack else None):
+                analysis_targets.append((board_before, move))
+    finally:
+        # The pipeline's cleanup (cancel pending searches, stop its threads)
+        # runs when the generator is closed, so don't leave that to the GC
+        if quick_results is not None:
+            quick_results.close()
+
+    # Batch analyze all positions (before and after move for each). The
+    # after-move board is built once here and reused by the second pass
     batch_requests = []
-    for idx in move_indices:
-        board_before, move = move_data[idx]
+    analysis_positions = []
+    limits = analysis_limits(engine_think_time)  # shared by every request in the game
+    for board_before, move in analysis_targets:
         board_after = board_before.copy()
         board_after.push(move)
-        batch_requests.append((board_before, chess.engine.Limit(time=engine_think_time)))
-        batch_requests.append((board_after, chess.engine.Limit(time=engine_think_time)))
+        analysis_positions.append((board_before, board_after, move))
+        batch_requests.extend(analysis_requests_for_move(board_before, board_after, move, limits))
 
-    batch_results = []
-    if batch_requests:
-        batch_results = analyze_positions_batch(engine, batch_requests, debug_mode)
+    if ENABLE_PIPELINED_ENGINE_ANALYSIS:
+        # Each move's pair stays on one engine so the played-move search reuses its hash
+        analysis_results = analyze_positions_pipelined(engine, batch_requests, debug_mode, helper_engines,
+                                                       group_size=2)
+    else:
+        analysis_results = iter(analyze_positions_batch(engine, batch_requests, debug_mode))
 
-    # Second pass: process results
-    blunder_idx = 0
-    for i, idx in enumerate(move_indices):
-        board_before, move = move_data[idx]
-        board_after = board_before.copy()
-        board_after.push(move)
-        info_before_move = batch_results[blunder_idx * 2] if batch_results else None
-        info_after_move = batch_results[blunder_idx * 2 + 1] if batch_results else None
-        best_move_info = info_before_move  # For now, use info_before_move as best_move_info
-        actual_move_number = board_before.fullmove_number
-        blunder_info = categorize_blunder_optimized(
-            board_before, board_after, move, info_before_move, info_after_move,
-            best_move_info, state_manager, debug_mode, actual_move_number
-        )
-        if blunder_info:
-            blunder_key = f"{blunder_info['category']}_{actual_move_number}"
-            if not state_manager.has_reported(blunder_key):
-                blunders.append(blunder_info)
-                state_manager.mark_reported(blunder_key)
-        blunder_idx += 1
+    # Second pass: process results as they arrive
+    try:
+        for board_before, board_after, move in analysis_positions:
+            info_before_move = next(analysis_results)
+            info_after_move = next(analysis_results)
+            best_move_info = info_before_move  # For now, use info_before_move as best_move_info
+            actual_move_number = board_before.fullmove_number
+            blunder_info = categorize_blunder_optimized(
+                board_before, board_after, move, info_before_move, info_after_move,
+                best_move_info, state_manager, debug_mode, actual_move_number
+            )
+            if blunder_info:
+                blunder_key = (blunder_info['category'], actual_move_number)
+                if not state_manager.has_reported(blunder_key):
+                    blunders.append(blunder_info)
+                    state_manager.mark_reported(blunder_key)
+    finally:
+        if ENABLE_PIPELINED_ENGINE_ANALYSIS:
+            analysis_results.close()
 
     return blunders
\ No newline at end of file
@@ -21,6 +21,9 @@ ENGINE_THINK_TIME = 0.08  # Changed to balanced for better accuracy
 # Batch Engine Analysis Configuration
 ENABLE_BATCH_ENGINE_ANALYSIS = True
 BATCH_ANALYSIS_SIZE = 20  # Positions per batch
+ENABLE_PIPELINED_ENGINE_ANALYSIS = True  # Categorize move N while the engine searches move N+1
+ENABLE_ROOT_MOVE_ANALYSIS = True  # Score the played move from the position before it (root_moves=[move])
+ROOT_MOVE_THINK_TIME_SCALE = 0.5  # Share of the think time for that search; it reuses the first search's hash
 
 # Position Filtering Thresholds (Step 1.2 Enhancement)
 SKIP_FORCED_MOVES = True
@@ -32,6 +35,9 @@ TABLEBASE_PIECE_LIMIT = 6
 # Lazy Evaluation Thresholds (Step 1.3 Enhancement)
 MIN_EVAL_DROP_FOR_ANALYSIS = 50  # Centipawns
 EXPENSIVE_CHECK_THRESHOLD = 25    # Win probability drop % before running expensive checks (increased to reduce trap detection)
+OPENING_DETECTOR_BYPASS = True    # Suppress material-detector reports before OPENING_DETECTOR_CUTOFF_MOVE
+OPENING_DETECTOR_CUTOFF_MOVE = 8  # Full move number below which only eval-based checks run
+OPENING_BYPASS_THRESHOLD_SCALE = 1.5  # Stricter opening thresholds so book-phase eval noise isn't reported
 
 # Game Analysis Settings
 GAMES_TO_FETCH = 1
@@ -127,6 +133,10 @@ PIECE_NAMES = {
     6: "King"
 }
 
+# Piece-type indexed views of the tables above for hot loops (index 0 is a sentinel)
+PIECE_VALUES_T = (0,) + tuple(PIECE_VALUES[piece_type] for piece_type in range(1, 7))
+PIECE_NAMES_T = ("piece",) + tuple(PIECE_NAMES[piece_type] for piece_type in range(1, 7))
+
 # Category Weights for Severity Scoring (Production values)
 CATEGORY_WEIGHTS = {
     "Allowed Checkmate": 3.0,
@@ -257,6 +267,10 @@ OPTIMIZATION_DESCRIPTIONS = {
 PARALLEL_PROCESSING_ENABLED = True
 PARALLEL_GAME_WORKERS = 4          # Number of concurrent game analysis workers
 PARALLEL_MOVE_WORKERS = 2          # Number of concurrent move analysis workers per game
+PARALLEL_USE_PROCESSES = True      # Run game batches in worker processes (one engine each) instead of threads
+WORKER_ENGINE_THREADS = 1          # Search threads per worker engine, so N workers use ~N cores
+WORKER_ENGINE_HASH_MB = 64         # Hash table size per worker engine
+PGN_PREFETCH_GAMES = 4             # Games parsed ahead of the engine in sequential analysis
 ENGINE_POOL_SIZE = 6               # Increased from 2 to support parallel processing
 GAME_BATCH_SIZE = 10               # Games per batch for parallel processing
 MEMORY_STREAMING_ENABLED = False   # Disable streaming for stability - collect in memory instead
@@ -45,6 +45,16 @@ class StockfishPool:
                         logger.warning("No engines available and pool is full")
                         return None
 
+    def try_get_idle_engine(self) -> Optional[chess.engine.SimpleEngine]:
+        """
+        Get an engine only if one is sitting idle in the pool right now.
+        Never starts a new engine and never waits.
+        """
+        try:
+            return self.available_engines.get_nowait()
+        except Empty:
+            return None
+
     def return_engine(self, engine: chess.engine.SimpleEngine):
         """Return an engine to the pool"""
         if engine:
@@ -0,0 +1,78 @@
+import os
+import sys
+
+import chess
+import chess.engine
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyze_games
+from analyze_games import (OPENING_BLUNDER, OPENING_MISTAKE, BlunderStateManager, categorize_blunder_optimized,
+                           cp_to_win_prob)
+from config import OPENING_BYPASS_THRESHOLD_SCALE, OPENING_DETECTOR_CUTOFF_MOVE
+
+# 3.Ng5 leaves the knight hanging to the queen on d8
+HANGING_KNIGHT_FEN = "rnbqkbnr/pppp1ppp/8/4p3/8/5N2/PPPPPPPP/RNBQKB1R w KQkq - 0 {}"
+HANGING_KNIGHT_MOVE = chess.Move.from_uci("f3g5")
+
+
+def win_prob_drop(eval_after):
+    return (cp_to_win_prob(0) - cp_to_win_prob(eval_after)) * 100
+
+
+def categorize(fullmove_number, eval_after, state_manager=None):
+    board_before = chess.Board(HANGING_KNIGHT_FEN.format(fullmove_number))
+    board_after = board_before.copy()
+    board_after.push(HANGING_KNIGHT_MOVE)
+
+    def info(cp, move):
+        return {"score": chess.engine.PovScore(chess.engine.Cp(cp), chess.WHITE), "pv": [move]}
+
+    if state_manager is None:
+        state_manager = BlunderStateManager()
+    return categorize_blunder_optimized(board_before, board_after, HANGING_KNIGHT_MOVE,
+                                        info(0, HANGING_KNIGHT_MOVE), info(eval_after, HANGING_KNIGHT_MOVE),
+                                        info(0, chess.Move.from_uci("d2d4")), state_manager, False,
+                                        fullmove_number)
+
+
+@pytest.fixture(autouse=True)
+def book_phase_bypass(monkeypatch):
+    monkeypatch.setattr(analyze_games, "OPENING_DETECTOR_BYPASS", True)
+
+
+def test_hanging_piece_reported_after_book_phase():
+    result = categorize(OPENING_DETECTOR_CUTOFF_MOVE, -400)
+    assert result["category"] == "Hanging a Piece"
+
+
+def test_hanging_piece_not_reported_in_book_phase():
+    state_manager = BlunderStateManager()
+    result = categorize(3, -400, state_manager)
+    assert result["category"] != "Hanging a Piece"
+    # The hanging check still ran, so the knight is tracked as a known weakness
+    assert any(key[2] == chess.G5 for key in state_manager.active_weaknesses)
+
+
+@pytest.mark.parametrize("eval_after, expected", [
+    # Past the scaled mistake threshold but short of the scaled blunder one,
+    # which would be a Blunder at the unscaled thresholds
+    (-400, "Mistake"),
+    # An opening Mistake at the unscaled thresholds, not reported here
+    (-300, None),
+])
+def test_book_phase_thresholds_scaled(eval_after, expected):
+    drop = win_prob_drop(eval_after)
+    if expected == "Mistake":
+        assert OPENING_BLUNDER <= drop < OPENING_BLUNDER * OPENING_BYPASS_THRESHOLD_SCALE
+        assert drop >= OPENING_MISTAKE * OPENING_BYPASS_THRESHOLD_SCALE
+    else:
+        assert OPENING_MISTAKE <= drop < OPENING_MISTAKE * OPENING_BYPASS_THRESHOLD_SCALE
+
+    result = categorize(3, eval_after)
+
+    if expected is None:
+        assert result is None
+    else:
+        assert result["category"] == expected
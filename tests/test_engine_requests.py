@@ -0,0 +1,113 @@
+import os
+import shutil
+import sys
+
+import chess
+import chess.engine
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyze_games
+from analyze_games import analyse_request, analysis_limits, analysis_requests_for_move, analyze_positions_pipelined
+from config import STOCKFISH_PATH
+
+
+class RecordingEngine:
+    """Stands in for a SimpleEngine: records each analyse() call and echoes it back"""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = []
+
+    def analyse(self, board, limit, root_moves=None):
+        self.calls.append((board.fen(), limit, root_moves))
+        return {"engine": self.name, "fen": board.fen(), "root_moves": root_moves}
+
+
+def test_analyse_request_without_root_moves():
+    engine = RecordingEngine("main")
+    board = chess.Board()
+    limit = chess.engine.Limit(time=0.1)
+    analyse_request(engine, (board, limit))
+    assert engine.calls == [(board.fen(), limit, None)]
+
+
+def test_analyse_request_passes_root_moves():
+    engine = RecordingEngine("main")
+    board = chess.Board()
+    limit = chess.engine.Limit(time=0.1)
+    move = chess.Move.from_uci("e2e4")
+    analyse_request(engine, (board, limit, [move]))
+    assert engine.calls == [(board.fen(), limit, [move])]
+
+
+@pytest.mark.parametrize("root_move_analysis", [True, False])
+def test_analysis_requests_for_move(monkeypatch, root_move_analysis):
+    monkeypatch.setattr(analyze_games, "ENABLE_ROOT_MOVE_ANALYSIS", root_move_analysis)
+    board_before = chess.Board()
+    move = chess.Move.from_uci("e2e4")
+    board_after = board_before.copy()
+    board_after.push(move)
+    before_limit, after_limit = limits = analysis_limits(0.2)
+
+    before_request, after_request = analysis_requests_for_move(board_before, board_after, move, limits)
+
+    assert before_request == (board_before, before_limit)
+    if root_move_analysis:
+        assert after_limit.time == pytest.approx(0.2 * analyze_games.ROOT_MOVE_THINK_TIME_SCALE)
+        assert after_request == (board_before, after_limit, [move])
+    else:
+        assert after_limit is before_limit
+        assert after_request == (board_after, after_limit)
+
+
+def test_pipelined_group_size_keeps_pairs_on_one_engine():
+    engines = [RecordingEngine("main"), RecordingEngine("helper1"), RecordingEngine("helper2")]
+    limit = chess.engine.Limit(time=0.1)
+    board = chess.Board()
+    requests = []
+    for move in list(board.legal_moves)[:8]:
+        board_after = board.copy()
+        board_after.push(move)
+        requests.extend(analysis_requests_for_move(board, board_after, move, (limit, limit)))
+
+    results = list(analyze_positions_pipelined(engines[0], requests, False, helper_engines=engines[1:],
+                                               group_size=2))
+
+    # Results come back in request order, and each pair shares one engine
+    assert [result["fen"] for result in results] == [request[0].fen() for request in requests]
+    for i in range(0, len(results), 2):
+        assert results[i]["engine"] == results[i + 1]["engine"] == engines[(i // 2) % len(engines)].name
+
+    # Each engine ran its pairs in order, before-search first
+    for engine in engines:
+        expected = [(request[0].fen(), request[1], request[2] if len(request) > 2 else None)
+                    for i, request in enumerate(requests)
+                    if engines[(i // 2) % len(engines)] is engine]
+        assert engine.calls == expected
+
+
+@pytest.mark.skipif(shutil.which(STOCKFISH_PATH) is None, reason="Stockfish not available")
+def test_root_move_score_matches_after_position_score():
+    # White takes an undefended queen: both ways of scoring Qxd5 should see that
+    board_before = chess.Board("4k3/8/8/3q4/8/8/3Q4/4K3 w - - 0 1")
+    move = chess.Move.from_uci("d2d5")
+    board_after = board_before.copy()
+    board_after.push(move)
+    turn_color = board_before.turn
+    limit = chess.engine.Limit(depth=14)
+
+    engine = chess.engine.SimpleEngine.popen_uci(shutil.which(STOCKFISH_PATH))
+    try:
+        root_move_info = analyse_request(engine, (board_before, limit, [move]))
+        after_info = analyse_request(engine, (board_after, limit))
+    finally:
+        engine.quit()
+
+    assert root_move_info["pv"][0] == move
+    root_move_score = root_move_info["score"].pov(turn_color).score(mate_score=10000)
+    after_score = after_info["score"].pov(turn_color).score(mate_score=10000)
+    assert root_move_score > 500
+    assert after_score > 500
+    assert abs(root_move_score - after_score) < 150
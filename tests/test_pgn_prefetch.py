@@ -0,0 +1,104 @@
+import io
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis_service import _prefetched, _read_games_prefetched
+
+PGN = """[Event "1"]
+[White "alice"]
+[Black "bob"]
+
+1. e4 e5 2. Nf3 Nc6 1-0
+
+[Event "2"]
+[White "carol"]
+[Black "dave"]
+
+1. d4 d5 0-1
+
+[Event "3"]
+[White "bob"]
+[Black "alice"]
+
+1. c4 e5 1/2-1/2
+"""
+
+
+class FailingPGN(io.StringIO):
+    """PGN file that raises once reading gets past fail_at characters"""
+
+    def __init__(self, text, fail_at):
+        super().__init__(text)
+        self.fail_at = fail_at
+
+    def readline(self, *args):
+        if self.tell() >= self.fail_at:
+            raise OSError("read failed")
+        return super().readline(*args)
+
+
+def reader_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "pgn-reader"]
+
+
+def test_prefetched_keeps_order():
+    assert list(_prefetched(iter(range(200)), max_prefetch=3)) == list(range(200))
+
+
+def test_prefetched_error_reaches_consumer_in_place():
+    def items():
+        yield 1
+        yield 2
+        raise ValueError("bad game")
+
+    consumed = []
+    with pytest.raises(ValueError, match="bad game"):
+        for item in _prefetched(items(), max_prefetch=4):
+            consumed.append(item)
+    assert consumed == [1, 2]
+    assert not reader_threads()
+
+
+def test_prefetched_close_stops_producer():
+    produced = []
+
+    def items():
+        for i in range(10000):
+            produced.append(i)
+            yield i
+
+    prefetched = _prefetched(items(), max_prefetch=2)
+    assert [next(prefetched), next(prefetched)] == [0, 1]
+    prefetched.close()
+
+    # The producer was joined on close, and stopped within the queue bound
+    assert not reader_threads()
+    assert len(produced) <= 2 + 2 + 1
+
+
+def test_read_games_in_order():
+    games = list(_read_games_prefetched(io.StringIO(PGN), max_prefetch=1))
+    assert [headers["Event"] for headers, _ in games] == ["1", "2", "3"]
+    assert all(game is not None and game.headers == headers for headers, game in games)
+
+
+def test_read_games_skips_other_users_games():
+    games = list(_read_games_prefetched(io.StringIO(PGN), max_prefetch=1, target_user="Alice"))
+    assert [headers["Event"] for headers, _ in games] == ["1", "2", "3"]
+    assert [game is not None for _, game in games] == [True, False, True]
+    assert [move.uci() for move in games[2][1].mainline_moves()] == ["c2c4", "e7e5"]
+
+
+def test_read_games_error_reaches_consumer_in_place():
+    pgn_file = FailingPGN(PGN, fail_at=PGN.index('[Event "2"]'))
+    games = _read_games_prefetched(pgn_file, max_prefetch=1)
+    headers, game = next(games)
+    assert headers["Event"] == "1"
+    with pytest.raises(OSError, match="read failed"):
+        next(games)
+    assert not reader_threads()
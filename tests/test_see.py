@@ -0,0 +1,109 @@
+import os
+import random
+import sys
+
+import chess
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyze_games import BB_BACK_RANKS, see_ge, see_uncached
+from config import PIECE_VALUES_T
+
+
+def reference_see(board, move):
+    """
+    Exchange on move.to_square played out on a board copy: each side recaptures
+    with its least valuable attacker (lowest square first) or stands pat, the
+    king only captures into an undefended square and a pawn recapturing on the
+    back rank becomes a queen.
+    """
+    if not board.is_capture(move):
+        return 0
+    target = move.to_square
+    board = board.copy(stack=False)
+    if board.is_en_passant(move):
+        captured_type = chess.PAWN
+        board.remove_piece_at(target ^ 8)
+    else:
+        captured_type = board.piece_type_at(target)
+    mover_color = board.turn
+    on_target = move.promotion or board.piece_type_at(move.from_square)
+    board.remove_piece_at(move.from_square)
+    board.set_piece_at(target, chess.Piece(on_target, mover_color))
+
+    def recapture(color, on_target):
+        attackers = board.attackers_mask(color, target)
+        if not attackers:
+            return 0
+        square = min(chess.scan_forward(attackers),
+                     key=lambda sq: (PIECE_VALUES_T[board.piece_type_at(sq)], sq))
+        piece_type = board.piece_type_at(square)
+        board.remove_piece_at(square)
+        board.set_piece_at(target, chess.Piece(piece_type, color))
+        if piece_type == chess.KING and board.attackers_mask(not color, target):
+            return 0
+        if piece_type == chess.PAWN and BB_BACK_RANKS & chess.BB_SQUARES[target]:
+            piece_type = chess.QUEEN
+        return max(0, PIECE_VALUES_T[on_target] - recapture(not color, piece_type))
+
+    return PIECE_VALUES_T[captured_type] - recapture(not mover_color, on_target)
+
+
+def random_captures(games, seed):
+    rng = random.Random(seed)
+    for _ in range(games):
+        board = chess.Board()
+        for _ in range(rng.randint(20, 120)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            for move in moves:
+                if board.is_capture(move):
+                    yield board, move
+            captures = [move for move in moves if board.is_capture(move)]
+            board.push(rng.choice(captures) if captures and rng.random() < 0.5 else rng.choice(moves))
+
+
+@pytest.mark.parametrize("fen, uci, expected", [
+    # Exchanges that must be played out to the end, not cut off early
+    ("r1q1kbn1/p1p1ppp1/4r3/2BQ3p/5P2/3b2P1/P3P2P/RN2KBNR b KQq - 0 15", "e6e2", -400),
+    ("1nbk1b1R/4ppp1/1r1P1n1B/pp6/2PP4/P4P2/4P1P1/RN1QKBN1 b Q - 2 11", "g7h6", 320),
+    # Undefended piece
+    ("4k3/8/8/3n4/8/8/8/3RK3 w - - 0 1", "d1d5", 300),
+    # Pawn takes defended knight
+    ("4k3/8/4p3/3n4/4P3/8/8/4K3 w - - 0 1", "e4d5", 200),
+    # Rook takes a pawn defended by a pawn
+    ("4k3/8/2p5/3p4/8/8/8/3RK3 w - - 0 1", "d1d5", -400),
+    # X-ray: the rook behind the rook joins the exchange
+    ("3rk3/8/8/3p4/8/8/3R4/3RK3 w - - 0 1", "d2d5", 100),
+    ("3rk3/3r4/8/3p4/8/8/3R4/3RK3 w - - 0 1", "d2d5", -400),
+    # En passant
+    ("4k3/8/8/3Pp3/8/8/8/4K3 w - e6 0 1", "d5e6", 100),
+    # Promotion by capture, recaptured by the rook
+    ("r3k3/1P6/8/8/8/8/8/4K3 w - - 0 1", "b7a8q", 500),
+    ("rr2k3/1P6/8/8/8/8/8/4K3 w - - 0 1", "b7a8q", -400),
+    # A pawn recapturing on the back rank is worth a queen to the next capture
+    ("1Rq1k3/P2n4/8/8/8/8/8/4K3 b - - 0 1", "c8b8", 500),
+    # The king recaptures, but only into an undefended square
+    ("4k3/3r4/8/8/8/8/3P4/4K3 b - - 0 1", "d7d2", -400),
+    ("3rk3/3r4/8/8/8/8/3P4/4K3 b - - 0 1", "d7d2", 100),
+    ("4k3/8/8/8/8/8/3p4/3QK3 b - - 0 1", "d2d1q", 0),
+])
+def test_see_known_positions(fen, uci, expected):
+    board = chess.Board(fen)
+    move = chess.Move.from_uci(uci)
+    assert reference_see(board, move) == expected
+    assert see_uncached(board, move) == expected
+
+
+def test_see_matches_reference_exchange():
+    for board, move in random_captures(40, seed=11):
+        assert see_uncached(board, move) == reference_see(board, move), (board.fen(), move.uci())
+
+
+def test_see_ge_matches_see():
+    for board, move in random_captures(15, seed=5):
+        value = see_uncached(board, move)
+        for threshold in (-500, -100, 0, 1, 100, 300, 500):
+            assert see_ge(board, move, threshold) == (value >= threshold), (board.fen(), move.uci(), threshold)
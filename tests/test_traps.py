@@ -0,0 +1,67 @@
+import os
+import sys
+
+import chess
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyze_games import CHESSCOM_TRAP_TABLE, detect_chesscom_exact_traps
+
+# For each CHESSCOM_TRAP_TABLE entry: a position (and the white move leading
+# to it) where the table's pawn push leaves the white piece with no moves
+TRAP_POSITIONS = {
+    # The rook pins the knight to the king, so ...b5 traps it
+    (chess.KNIGHT, chess.C4): ("k7/1p6/8/8/r6K/4N3/8/8 w - - 0 1", "e3c4", "b5"),
+    # ...b4 uncovers check from the rook, and the queen can't block or capture
+    (chess.QUEEN, chess.C3): ("6k1/8/8/rpK5/8/8/3Q4/8 w - - 0 1", "d2c3", "b4"),
+}
+
+
+def board_after(fen, uci):
+    board = chess.Board(fen)
+    board.push_uci(uci)
+    return board
+
+
+def test_every_table_entry_has_a_position():
+    assert set(TRAP_POSITIONS) == set(CHESSCOM_TRAP_TABLE)
+
+
+@pytest.mark.parametrize("entry", sorted(CHESSCOM_TRAP_TABLE))
+def test_table_trap_detected(entry):
+    piece_type, piece_square = entry
+    fen, uci, trapping_move_san = TRAP_POSITIONS[entry]
+    board = board_after(fen, uci)
+
+    trap = detect_chesscom_exact_traps(board, piece_square, chess.WHITE, False)
+
+    assert trap == {
+        "trapping_move": CHESSCOM_TRAP_TABLE[entry],
+        "trapping_move_san": trapping_move_san,
+        "piece_name": chess.piece_name(piece_type).capitalize(),
+        "piece_square": chess.square_name(piece_square),
+    }
+
+
+@pytest.mark.parametrize("fen, uci, piece_square, trapped", [
+    # Trap found
+    ("k7/1p6/8/8/r6K/4N3/8/8 w - - 0 1", "e3c4", chess.C4, True),
+    ("6k1/8/8/rpK5/8/8/3Q4/8 w - - 0 1", "d2c3", chess.C3, True),
+    # No table entry for the piece
+    ("k7/1p6/8/8/r6K/4N3/8/8 w - - 0 1", "e3g4", chess.G4, False),
+    # The pawn push isn't legal
+    ("k7/8/8/8/r6K/4N3/8/8 w - - 0 1", "e3c4", chess.C4, False),
+    # The push is played, but the piece still has moves
+    ("k7/1p6/8/8/7K/4N3/8/8 w - - 0 1", "e3c4", chess.C4, False),
+])
+def test_board_unchanged(fen, uci, piece_square, trapped):
+    board = board_after(fen, uci)
+    fen_before = board.fen()
+    move_stack_before = list(board.move_stack)
+
+    trap = detect_chesscom_exact_traps(board, piece_square, chess.WHITE, False)
+
+    assert (trap is not None) == trapped
+    assert board.fen() == fen_before
+    assert board.move_stack == move_stack_before
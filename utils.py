@@ -15,7 +15,7 @@ from urllib.parse import quote
 
 from config import (
     USERNAME_PATTERN, DANGEROUS_PATTERNS, CATEGORY_WEIGHTS,
-    BLUNDER_GENERAL_DESCRIPTIONS, PIECE_VALUES, PIECE_NAMES
+    BLUNDER_GENERAL_DESCRIPTIONS, PIECE_VALUES_T, PIECE_NAMES_T
 )
 
 # Set up logging
@@ -261,7 +261,9 @@ def get_piece_value(piece_type: int) -> int:
     Returns:
         int: Piece value in centipawns
     """
-    return PIECE_VALUES.get(piece_type, 0)
+    if 0 < piece_type < len(PIECE_VALUES_T):
+        return PIECE_VALUES_T[piece_type]
+    return 0
 
 def get_piece_name(piece_type: int) -> str:
     """
@@ -273,7 +275,9 @@ def get_piece_name(piece_type: int) -> str:
     Returns:
         str: Piece name
     """
-    return PIECE_NAMES.get(piece_type, "Unknown")
+    if 0 < piece_type < len(PIECE_NAMES_T):
+        return PIECE_NAMES_T[piece_type]
+    return "Unknown"
 
 # ========================================
 # SESSION AND ID UTILITIES